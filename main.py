@@ -1,22 +1,34 @@
 # bot.py
 import discord
 import re
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord.ext.commands import MissingPermissions
 import json
-import os
 import time
-from collections import defaultdict
-import aiofiles
+import datetime
 import random
 import string
-import aiohttp
 import asyncio
 import io
+import typing
 import yt_dlp
 from io import BytesIO
 from discord import app_commands
 from discord.ui import View, button
+from modules.filter_config import ExemptionCache, FilterStore, PUNISHMENTS
+from modules.offense_store import OffenseStore
+from modules import doxx_detector
+from modules.guild_policy import GuildPolicy, emoji_key
+from modules.spam_tracker import SpamTracker
+from modules.enforcement import Enforcer, RaidBatcher
+from modules.permission_fanout import fan_out, roll_back
+from modules.storage import Storage, encode_config
+from modules.http_pool import HttpPool
+from modules.mod_log import ModLogSink
+from modules.emoji_cache import EmojiCache
+from modules.name_resolver import NameResolver
+from modules.reaction_queue import ReactionQueue
+from modules import backup_scheduler, server_restore, user_backup
 
 intents = discord.Intents.default()
 intents.messages = True
@@ -24,14 +36,45 @@ intents.guilds = True
 intents.members = True
 intents.message_content = True
 
-bot = commands.Bot(command_prefix="$", intents=intents)
+# Shared connection pool for CDN downloads and log webhooks
+http_pool = HttpPool()
+
+class NeedBot(commands.Bot):
+    async def setup_hook(self):
+        await http_pool.start()
+
+    async def close(self):
+        await mod_log.flush()
+        await http_pool.close()
+        await super().close()
+
+bot = NeedBot(command_prefix="$", intents=intents)
 
 # ✅ EDIT: Put your whitelisted guild(s) and default data file here
 WHITELISTED_GUILDS = [1345476135487672350]
+DATABASE_FILE = "need.db"
+# Legacy JSON files, imported into the database once on first start
 DATA_FILE = "1345476135487672350.json"
 BACKUP_FILE = "user_backups.json"
+SERVER_BACKUP_FILE = "server_backup.json"
 NSFW_FILTER_FILE = "modules/nsfw_filter.json"
 TRAN_DATA_FILE = "modules/tran_data.json"
+ADMIN_DATA_FILE = "bot.json"
+EMOJI_CACHE_DIR = "emoji_cache"
+# Scheduled backups keep this many generations, none older than the max age
+SNAPSHOT_KEEP = 7
+SNAPSHOT_MAX_AGE = 30 * 24 * 3600
+
+storage = Storage(DATABASE_FILE)
+storage.import_json_files(
+    guild_file=DATA_FILE,
+    admins_file=ADMIN_DATA_FILE,
+    filter_file=NSFW_FILTER_FILE,
+    tran_file=TRAN_DATA_FILE,
+    user_backup_file=BACKUP_FILE,
+    server_backup_file=SERVER_BACKUP_FILE,
+    default_guild_id=WHITELISTED_GUILDS[0]
+)
 
 
 @bot.event
@@ -42,54 +85,156 @@ async def on_ready():
             await bot.tree.sync(guild=discord.Object(id=guild_id))
         except Exception as e:
             print(f"Failed to sync commands for guild {guild_id}: {e}")
+    if not flush_offenses.is_running():
+        flush_offenses.start()
+    if not evict_spam_history.is_running():
+        evict_spam_history.start()
+    if not flush_guild_configs.is_running():
+        flush_guild_configs.start()
+    if not flush_role_deltas.is_running():
+        flush_role_deltas.start()
+    if not compact_database.is_running():
+        compact_database.start()
+    if not scheduled_backups.is_running():
+        scheduled_backups.start()
+    enforcer.start()
+    reaction_queue.start()
     print(f"Bot is ready and commands synced for {len(WHITELISTED_GUILDS)} guild(s).")
 
 # Load persistent data
-if os.path.exists(DATA_FILE):
-    try:
-        with open(DATA_FILE, "r") as f:
-            auto_react_data = json.load(f)
-    except Exception:
-        auto_react_data = {}
-else:
-    auto_react_data = {}
+auto_react_data = storage.load_guild_configs()
+
+# Member/user lookups for the list commands
+name_resolver = NameResolver(bot)
+
+# Emoji images downloaded by `steal`, reused across guilds
+emoji_cache = EmojiCache(storage, EMOJI_CACHE_DIR)
+
+# NSFW filter config is held in memory and shared by the `nsfw` command and
+# on_message; it is only re-read when its row changes in the database
+filter_store = FilterStore(storage)
 
 def load_filter():
-    with open(NSFW_FILTER_FILE, "r") as f:
-        return json.load(f)
+    return filter_store.get()
 
 def save_filter(data):
-    with open(NSFW_FILTER_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    filter_store.save(data)
+
+# Cached NSFW/doxx exemption per member, invalidated on role changes
+exemption_cache = ExemptionCache()
+
+# Strike tracking for the NSFW filter (10 min window) and anti-doxx (7 days).
+# Recording a strike stays in memory; flush_offenses writes it behind.
+offense_store = OffenseStore(storage, {"nsfw": 600, "doxx": 7*24*3600})
+
+@tasks.loop(seconds=30)
+async def flush_offenses():
+    if offense_store.dirty:
+        data = offense_store.snapshot()
+        try:
+            await asyncio.to_thread(offense_store.write, data)
+        except Exception as e:
+            offense_store.dirty = True
+            print("Offense flush failed:", e)
 
 def load_tran_data():
-    if os.path.exists(TRAN_DATA_FILE):
-        with open(TRAN_DATA_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    return storage.get("tran_data", {})
 
 def save_tran_data(data):
-    with open(TRAN_DATA_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    storage.set("tran_data", data)
+
+# Compiled per-guild moderation policies: guild id (int) -> GuildPolicy
+guild_policies = {}
+
+def get_policy(guild_id):
+    policy = guild_policies.get(guild_id)
+    if policy is None:
+        policy = guild_policies[guild_id] = GuildPolicy.compile(auto_react_data.get(str(guild_id), {}))
+    return policy
+
+# Guilds changed since the last flush; saves in quick succession are
+# coalesced and written by flush_guild_configs in a single transaction
+dirty_guilds = set()
 
 # Async save
-async def save_data():
-    # Ensure directory exists where necessary
-    async with aiofiles.open(DATA_FILE, "w") as f:
-        await f.write(json.dumps(auto_react_data, indent=2))
+async def save_data(guild_id=None):
+    # recompile the policy of the guild that was just changed
+    if guild_id is None:
+        guild_policies.clear()
+        dirty_guilds.update(auto_react_data)
+    else:
+        guild_policies[int(guild_id)] = GuildPolicy.compile(auto_react_data.get(str(guild_id), {}))
+        dirty_guilds.add(str(guild_id))
+
+def take_dirty_configs():
+    # encoded on the loop so the writer thread never sees a config mid-edit
+    encoded = {gid: encode_config(auto_react_data.get(gid, {})) for gid in dirty_guilds}
+    dirty_guilds.clear()
+    return encoded
+
+@tasks.loop(seconds=2)
+async def flush_guild_configs():
+    if not dirty_guilds:
+        return
+    encoded = take_dirty_configs()
+    try:
+        await asyncio.to_thread(storage.save_guild_configs, encoded)
+    except Exception as e:
+        dirty_guilds.update(encoded)
+        print("Config flush failed:", e)
+
+# Guilds with "backup_schedule" (hours) in their config get server and user
+# snapshots on that interval, archived as generations next to the live backups
+# (restorable with gen:N); serialisation runs in a worker thread
+@tasks.loop(minutes=5)
+async def scheduled_backups():
+    for guild in bot.guilds:
+        hours = auto_react_data.get(str(guild.id), {}).get("backup_schedule")
+        if not hours or guild.id in restores_running:
+            continue
+        try:
+            if not await asyncio.to_thread(backup_scheduler.is_due, storage, guild.id, hours * 3600):
+                continue
+            data = server_restore.capture(guild)
+            await asyncio.to_thread(
+                backup_scheduler.snapshot_server, storage, guild.id, data, SNAPSHOT_KEEP, SNAPSHOT_MAX_AGE
+            )
+            rows = await user_backup.snapshot_members(guild.members)
+            await asyncio.to_thread(
+                backup_scheduler.snapshot_users, storage, guild.id, rows, SNAPSHOT_KEEP, SNAPSHOT_MAX_AGE
+            )
+        except Exception as e:
+            print(f"Scheduled backup failed for {guild.id}:", e)
 
-ADMIN_DATA_FILE = "bot.json"
-if os.path.exists(ADMIN_DATA_FILE):
-    with open(ADMIN_DATA_FILE, "r") as f:
-        admin_data = json.load(f)
-else:
+# Role changes since the last flush, appended to the user backup as deltas
+role_deltas = user_backup.DeltaBuffer()
+
+@tasks.loop(seconds=10)
+async def flush_role_deltas():
+    if not len(role_deltas):
+        return
+    pending = role_deltas.take()
+    try:
+        await asyncio.to_thread(user_backup.write_deltas, storage, pending)
+    except Exception as e:
+        role_deltas.restore(pending)
+        print("Role delta flush failed:", e)
+
+@tasks.loop(hours=1)
+async def compact_database():
+    try:
+        await asyncio.to_thread(storage.compact_user_backup)
+        await asyncio.to_thread(storage.checkpoint)
+    except Exception as e:
+        print("Checkpoint failed:", e)
+
+admin_data = storage.get("admins")
+if admin_data is None:
     admin_data = {"admins": [445468274659033088]}
-    with open(ADMIN_DATA_FILE, "w") as f:
-        json.dump(admin_data, f)
+    storage.set("admins", admin_data)
 
 async def save_admins():
-    async with aiofiles.open(ADMIN_DATA_FILE, "w") as f:
-        await f.write(json.dumps(admin_data, indent=2))
+    storage.set("admins", admin_data)
 
 def random_name(length=8):
     return ''.join(random.choices(string.ascii_lowercase + string.digits, k=length))
@@ -101,8 +246,76 @@ def make_embed(description: str, color=discord.Color.blurple(), title: str = Non
         e.title = title
     return e
 
-# In-memory short-term spam tracking: user_id -> list[timestamps]
-message_history = defaultdict(list)  # user_id -> list of timestamps (float)
+# In-memory short-term spam tracking: (guild_id, user_id) -> last 5 timestamps
+spam_tracker = SpamTracker(limit=5, window=5)
+
+@tasks.loop(minutes=1)
+async def evict_spam_history():
+    spam_tracker.evict_idle()
+
+MUTED_PERMS = {"send_messages": False, "add_reactions": False}
+_mute_role_locks = {}
+
+async def get_mute_role(guild, create=False, progress=None):
+    role = discord.utils.get(guild.roles, name="Muted")
+    if role or not create:
+        return role
+    # several workers may try to create the role at once during a raid
+    async with _mute_role_locks.setdefault(guild.id, asyncio.Lock()):
+        role = discord.utils.get(guild.roles, name="Muted")
+        if not role:
+            role = await guild.create_role(name="Muted")
+            await fan_out(guild.channels, role, MUTED_PERMS, progress=progress)
+    return role
+
+def progress_updater(message, label, every=2.0, unit="channels"):
+    # progress callback for fan_out/roll_back/restore_all that edits `message` at most every `every` seconds
+    last = 0.0
+
+    async def update(done, total):
+        nonlocal last
+        now = time.monotonic()
+        if done != total and now - last < every:
+            return
+        last = now
+        try:
+            await message.edit(embed=make_embed(
+                f"<a:clock:1401933869804032061> {label} **{done}/{total}** {unit}",
+                discord.Color.orange()
+            ))
+        except discord.HTTPException:
+            pass
+    return update
+
+# Guilds with a `$backup users restore` in progress
+restores_running = set()
+
+# Autoreact reactions are sent in the background; a target gets at most 5
+# reactions per 10 seconds, then only every 5th message is reacted to
+reaction_queue = ReactionQueue(rate=5, per=10, sample_every=5)
+
+# Punishments and deletes go through this queue so on_message returns at once
+enforcer = Enforcer(workers=4, get_mute_role=get_mute_role)
+
+async def report_raid_batch(guild, result, reason):
+    banned = result.banned
+    failed = result.failed
+    ids = ", ".join(str(u.id) for u in banned[:30])
+    if len(banned) > 30:
+        ids += f" … (+{len(banned) - 30})"
+    send_log(guild.id, discord.Embed(
+        title="Anti-raid batch",
+        description=(
+            f"Reason : {reason}\n"
+            f"Banned : **{len(banned)}** | Failed : **{len(failed)}**\n"
+            f"Time : {discord.utils.format_dt(discord.utils.utcnow(), 'F')}\n\n"
+            f"{ids}"
+        ),
+        color=discord.Color.red()
+    ))
+
+# Anti-raid bans are collected for a few seconds and sent through bulk_ban
+raid_batcher = RaidBatcher(window=3, report=report_raid_batch)
 
 # Global check: only allow commands from whitelisted guilds
 @bot.check
@@ -381,19 +594,29 @@ class ConfirmView(View):
         await interaction.response.edit_message(view=self)
         self.stop()
         
+def parse_generation(arg):
+    # "gen:N" -> N, anything else -> None
+    if isinstance(arg, str) and arg.lower().startswith("gen:") and arg[4:].isdigit():
+        return int(arg[4:])
+    return None
+
 @commands.has_permissions(manage_guild=True, administrator=True)
 @bot.command()
-async def backup(ctx, target=None, action=None, member: discord.Member = None):
+async def backup(ctx, target=None, action=None, member: typing.Union[discord.Member, str] = None):
     if target is None:
         embed = discord.Embed(
             title="Command: backup",
             description=(
                 "Syntax : `$backup users`\n"
+                "Syntax : `$backup users incremental`\n"
+                "Syntax : `$backup users compact`\n"
                 "Syntax : `$backup users file`\n"
                 "Syntax : `$backup users load <@user>`\n"
+                "Syntax : `$backup users restore [gen:N]`\n"
                 "Syntax : `$backup server`\n"
                 "Syntax : `$backup server file`\n"
-                "Syntax : `$backup server load`\n"
+                "Syntax : `$backup server load [gen:N]`\n"
+                "Syntax : `$backup schedule <hours|off>`\n"
                 "Syntax : `$backup status`"
             ),
             color=0x0a0a0a
@@ -402,31 +625,72 @@ async def backup(ctx, target=None, action=None, member: discord.Member = None):
         return
 
     if target.lower() == "status":
-        server_backup_exists = os.path.exists("server_backup.json")
-        user_backup_exists = os.path.exists("user_backups.json")
+        server_backup_exists = storage.get_server_backup(ctx.guild.id) is not None
+        user_backup_exists = storage.has_user_backup(ctx.guild.id)
 
         server_status = "<:enabled:1404451260052144228>" if server_backup_exists else "<:disabled:1404450164118126683>"
         user_status = "<:enabled:1404451260052144228>" if user_backup_exists else "<:disabled:1404450164118126683>"
+        if user_backup_exists:
+            user_status += f" (+{storage.user_delta_count(ctx.guild.id)} changes)"
 
         overall_status = "Active" if server_backup_exists or user_backup_exists else "Inactive"
 
+        hours = auto_react_data.get(str(ctx.guild.id), {}).get("backup_schedule")
+        schedule = f"every **{hours}h**" if hours else "**Off**"
+        generations = ""
+        for kind in ("server", "users"):
+            latest = storage.latest_generation(ctx.guild.id, kind)
+            if latest:
+                kept = ", ".join(str(n) for n in storage.generation_numbers(ctx.guild.id, kind))
+                generations += (
+                    f"\n**Latest {kind.capitalize()} Generation** : #{latest['generation']} "
+                    f"<t:{int(latest['created_at'])}:R> built in **{latest['build_seconds']:.2f}s** "
+                    f"({round(latest['size'] / 1024 / 1024, 2)}MB) | kept: {kept}"
+                )
+
         embed = discord.Embed(
             description=(
                 f"Backups are **{overall_status}** for this server\n\n"
                 f"**Server Backup** : {server_status}\n"
-                f"**User Backup** : {user_status}"
+                f"**User Backup** : {user_status}\n"
+                f"**Schedule** : {schedule}"
+                f"{generations}"
             ),
             color=0x0a0a0a
         )
         await ctx.send(embed=embed)
         return
 
+    if target.lower() == "schedule":
+        config = auto_react_data.setdefault(str(ctx.guild.id), {})
+        if action is None:
+            hours = config.get("backup_schedule")
+            await ctx.send(embed=make_embed(
+                f"Scheduled backups run every **{hours}h**" if hours else "Scheduled backups are **Off**"
+            ))
+            return
+        if action.lower() == "off":
+            config.pop("backup_schedule", None)
+            await save_data(ctx.guild.id)
+            await ctx.send(embed=make_embed("<:Ok:1401589649088057425> Scheduled backups disabled", discord.Color.green()))
+            return
+        if not action.isdigit() or int(action) < 1:
+            await ctx.send(embed=make_embed("<:warning:1401590117499408434> Interval must be a whole number of hours.", discord.Color.orange()))
+            return
+        config["backup_schedule"] = int(action)
+        await save_data(ctx.guild.id)
+        await ctx.send(embed=make_embed(
+            f"<:Ok:1401589649088057425> Server and user backups will be taken every **{int(action)}h** "
+            f"(keeping {SNAPSHOT_KEEP} generations)",
+            discord.Color.green()
+        ))
+        return
+
     if target.lower() == "users":
         if action is None or action.lower() == "backup":
-            members = [m for m in ctx.guild.members if not m.bot]
-            data = {str(m.id): [r.id for r in m.roles if r != ctx.guild.default_role] for m in members}
-            size_kb = len(json.dumps(data).encode("utf-8")) / 1024
-            size_mb = round(size_kb / 1024, 2)
+            # estimated from cached counts; the roster is only read after approval
+            user_count, size = user_backup.estimate_size(ctx.guild)
+            size_mb = round(size / 1024 / 1024, 2)
 
             view = ConfirmView(ctx.author)
             await ctx.send(embed=make_embed(
@@ -440,33 +704,98 @@ async def backup(ctx, target=None, action=None, member: discord.Member = None):
             if size_mb > 500:
                 await ctx.send(embed=make_embed("<a:clock:1401933869804032061> This may take a while . . .", discord.Color.orange()))
 
-            with open("user_backups.json", "w") as f:
-                json.dump(data, f, indent=4)
-
-            user_count = len(data)
+            user_count = await user_backup.write_backup(storage, ctx.guild.id, ctx.guild.members)
             await ctx.send(embed=make_embed(
                 f"<:files:1403754002989973566> Backup created successfully with size **{size_mb}MB** with **{user_count} Users**",
                 discord.Color.green()
             ))
+        elif action.lower() == "incremental":
+            if not storage.has_user_backup(ctx.guild.id):
+                await ctx.send(embed=make_embed("<:warning:1401590117499408434> No backup file found. Run `$backup users` first.", discord.Color.orange()))
+                return
+            # pick up changes that on_member_update already buffered, then diff the rest
+            pending = role_deltas.take()
+            try:
+                await asyncio.to_thread(user_backup.write_deltas, storage, pending)
+            except Exception:
+                role_deltas.restore(pending)
+                raise
+            rows = await user_backup.snapshot_members(ctx.guild.members)
+            changed = await asyncio.to_thread(user_backup.write_incremental, storage, ctx.guild.id, rows)
+            await ctx.send(embed=make_embed(
+                f"<:files:1403754002989973566> Incremental backup saved with **{len(changed)} Users** changed",
+                discord.Color.green()
+            ))
+        elif action.lower() == "restore":
+            if ctx.guild.id in restores_running:
+                await ctx.send(embed=make_embed("<:warning:1401590117499408434> A restore is already running.", discord.Color.orange()))
+                return
+            generation = parse_generation(member)
+            if member is not None and generation is None:
+                await ctx.send(embed=make_embed("<:warning:1401590117499408434> Use `gen:N` to restore a generation.", discord.Color.orange()))
+                return
+            rows = None
+            if generation is not None:
+                rows = await asyncio.to_thread(backup_scheduler.load_users, storage, ctx.guild.id, generation)
+                if rows is None:
+                    await ctx.send(embed=make_embed(f"<:warning:1401590117499408434> Generation **#{generation}** not found.", discord.Color.orange()))
+                    return
+            elif not storage.has_user_backup(ctx.guild.id):
+                await ctx.send(embed=make_embed("<:warning:1401590117499408434> No backup file found.", discord.Color.orange()))
+                return
+
+            checkpoint = storage.get(user_backup.restore_key(ctx.guild.id, generation))
+            question = "Do you want to **restore all users**?"
+            if generation is not None:
+                question = f"Do you want to **restore all users** from generation **#{generation}**?"
+            if checkpoint:
+                question = f"Do you want to **resume the user restore** from **{checkpoint['done']}** users?"
+            view = ConfirmView(ctx.author)
+            await ctx.send(embed=make_embed(f"<:warning:1401590117499408434> {question}", discord.Color.orange()), view=view)
+            await view.wait()
+            if not view.value:
+                return
+
+            status = await ctx.send(embed=make_embed("<a:clock:1401933869804032061> Restoring users . . .", discord.Color.orange()))
+            restores_running.add(ctx.guild.id)
+            try:
+                result = await user_backup.restore_all(
+                    storage, ctx.guild, progress=progress_updater(status, "Restoring", unit="users"),
+                    rows=rows, generation=generation
+                )
+            finally:
+                restores_running.discard(ctx.guild.id)
+            await status.edit(embed=make_embed(
+                f"<:Ok:1401589649088057425> Users restored **{result['restored']} Restored | {result['failed']} Failed | "
+                f"{result['missing']} Not in server**",
+                discord.Color.green()
+            ))
+        elif action.lower() == "compact":
+            folded = await asyncio.to_thread(storage.compact_user_backup, ctx.guild.id)
+            await ctx.send(embed=make_embed(
+                f"<:Ok:1401589649088057425> Folded **{folded}** changes into the user backup",
+                discord.Color.green()
+            ))
         elif action.lower() == "file":
-            if not os.path.exists("user_backups.json"):
+            if not storage.has_user_backup(ctx.guild.id):
                 await ctx.send(embed=make_embed("<:warning:1401590117499408434> No backup file found.", discord.Color.orange()))
                 return
             try:
-                await ctx.author.send(file=discord.File("user_backups.json"))
+                fp = io.BytesIO()
+                await asyncio.to_thread(user_backup.export_ndjson_gz, storage, ctx.guild.id, fp)
+                await ctx.author.send(file=discord.File(fp, filename="user_backups.ndjson.gz"))
                 await ctx.send(embed=make_embed("<:Ok:1401589649088057425> File sent via **DMs**", discord.Color.green()))
             except discord.Forbidden:
                 await ctx.send(embed=make_embed("<:warning:1401590117499408434> I couldn't send you the file via DMs. Please check your privacy settings.", discord.Color.orange()))
         elif action.lower() == "load":
-            if member is None:
+            if not isinstance(member, discord.Member):
                 await ctx.send(embed=make_embed("<:warning:1401590117499408434> Missing required argument: `member`", discord.Color.orange()))
                 return
-            if not os.path.exists("user_backups.json"):
+            if not storage.has_user_backup(ctx.guild.id):
                 await ctx.send(embed=make_embed("<:warning:1401590117499408434> No backup file found.", discord.Color.orange()))
                 return
-            with open("user_backups.json", "r") as f:
-                data = json.load(f)
-            if str(member.id) not in data:
+            role_ids = storage.get_user_backup(ctx.guild.id, member.id)
+            if role_ids is None:
                 await ctx.send(embed=make_embed("<:warning:1401590117499408434> User not found in backup.", discord.Color.orange()))
                 return
 
@@ -479,9 +808,9 @@ async def backup(ctx, target=None, action=None, member: discord.Member = None):
             if not view.value:
                 return
 
-            roles = [ctx.guild.get_role(rid) for rid in data[str(member.id)] if ctx.guild.get_role(rid)]
-            failed = sum(1 for rid in data[str(member.id)] if ctx.guild.get_role(rid) is None)
-            await member.add_roles(*roles, reason="User restored")
+            roles, failed = user_backup.resolve_roles(ctx.guild, role_ids, member)
+            if roles:
+                await member.add_roles(*roles, reason="User restored")
             await ctx.send(embed=make_embed(
                 f"<:Ok:1401589649088057425> User restored **{failed} Roles failed | {len(roles)} Roles given**",
                 discord.Color.green()
@@ -491,37 +820,7 @@ async def backup(ctx, target=None, action=None, member: discord.Member = None):
 
     elif target.lower() == "server":
         if action is None or action.lower() == "backup":
-            guild = ctx.guild
-            categories = []
-            for cat in guild.categories:
-                cat_data = {"name": cat.name, "channels": []}
-                for ch in sorted(cat.channels, key=lambda c: c.position):
-                    ch_data = {
-                        "name": ch.name,
-                        "type": str(ch.type),
-                        "position": ch.position,
-                        "slowmode_delay": getattr(ch, "slowmode_delay", 0),
-                        "nsfw": getattr(ch, "nsfw", False),
-                        "bitrate": getattr(ch, "bitrate", None),
-                        "user_limit": getattr(ch, "user_limit", None)
-                    }
-                    cat_data["channels"].append(ch_data)
-                categories.append(cat_data)
-
-            uncategorized = []
-            for ch in sorted([c for c in guild.channels if c.category is None], key=lambda c: c.position):
-                ch_data = {
-                    "name": ch.name,
-                    "type": str(ch.type),
-                    "position": ch.position,
-                    "slowmode_delay": getattr(ch, "slowmode_delay", 0),
-                    "nsfw": getattr(ch, "nsfw", False),
-                    "bitrate": getattr(ch, "bitrate", None),
-                    "user_limit": getattr(ch, "user_limit", None)
-                }
-                uncategorized.append(ch_data)
-
-            data = {"categories": categories, "uncategorized": uncategorized}
+            data = server_restore.capture(ctx.guild)
             size_kb = len(json.dumps(data).encode("utf-8")) / 1024
             size_mb = round(size_kb / 1024, 2)
 
@@ -537,87 +836,162 @@ async def backup(ctx, target=None, action=None, member: discord.Member = None):
             if size_mb > 500:
                 await ctx.send(embed=make_embed("<a:clock:1401933869804032061> This may take a while . . .", discord.Color.orange()))
 
-            with open("server_backup.json", "w") as f:
-                json.dump(data, f, indent=4)
+            storage.set_server_backup(ctx.guild.id, data)
 
-            total_channels = sum(len(c["channels"]) for c in categories) + len(uncategorized)
+            total_channels = server_restore.channel_count(data)
             await ctx.send(embed=make_embed(
                 f"<:files:1403754002989973566> Backup created successfully with size **{size_mb}MB** with **{total_channels} Channels**",
                 discord.Color.green()
             ))
         elif action and action.lower() == "file":
-            if not os.path.exists("server_backup.json"):
+            data = storage.get_server_backup(ctx.guild.id)
+            if data is None:
                 await ctx.send(embed=make_embed("<:warning:1401590117499408434> No backup file found.", discord.Color.orange()))
                 return
             try:
-                await ctx.author.send(file=discord.File("server_backup.json"))
+                fp = io.BytesIO(json.dumps(data, indent=4).encode("utf-8"))
+                await ctx.author.send(file=discord.File(fp, filename=SERVER_BACKUP_FILE))
                 await ctx.send(embed=make_embed("<:Ok:1401589649088057425> File sent via **DMs**", discord.Color.green()))
             except discord.Forbidden:
                 await ctx.send(embed=make_embed("<:warning:1401590117499408434> I couldn't send you the file via DMs. Please check your privacy settings.", discord.Color.orange()))
         elif action and action.lower() == "load":
-            if not os.path.exists("server_backup.json"):
-                await ctx.send(embed=make_embed("<:warning:1401590117499408434> No backup file found.", discord.Color.orange()))
+            generation = parse_generation(member)
+            if member is not None and generation is None:
+                await ctx.send(embed=make_embed("<:warning:1401590117499408434> Use `gen:N` to restore a generation.", discord.Color.orange()))
                 return
-            with open("server_backup.json", "r") as f:
-                data = json.load(f)
+            if generation is not None:
+                data = await asyncio.to_thread(backup_scheduler.load_server, storage, ctx.guild.id, generation)
+                if data is None:
+                    await ctx.send(embed=make_embed(f"<:warning:1401590117499408434> Generation **#{generation}** not found.", discord.Color.orange()))
+                    return
+            else:
+                data = storage.get_server_backup(ctx.guild.id)
+                if data is None:
+                    await ctx.send(embed=make_embed("<:warning:1401590117499408434> No backup file found.", discord.Color.orange()))
+                    return
 
+            question = "Do you want to **restore the server**?"
+            if generation is not None:
+                question = f"Do you want to **restore the server** from generation **#{generation}**?"
             view = ConfirmView(ctx.author)
             await ctx.send(embed=make_embed(
-                "<:warning:1401590117499408434> Do you want to **restore the server**?",
+                f"<:warning:1401590117499408434> {question}",
                 discord.Color.orange()
             ), view=view)
             await view.wait()
             if not view.value:
                 return
 
-            for ch in ctx.guild.channels:
-                await ch.delete()
-
-            for cat_data in data["categories"]:
-                category = await ctx.guild.create_category(cat_data["name"])
-                for ch_data in cat_data["channels"]:
-                    if ch_data["type"] == "text":
-                        await ctx.guild.create_text_channel(
-                            ch_data["name"],
-                            category=category,
-                            slowmode_delay=ch_data["slowmode_delay"],
-                            nsfw=ch_data["nsfw"],
-                            position=ch_data["position"]
-                        )
-                    elif ch_data["type"] == "voice":
-                        await ctx.guild.create_voice_channel(
-                            ch_data["name"],
-                            category=category,
-                            bitrate=ch_data["bitrate"],
-                            user_limit=ch_data["user_limit"],
-                            position=ch_data["position"]
-                        )
-            for ch_data in data["uncategorized"]:
-                if ch_data["type"] == "text":
-                    await ctx.guild.create_text_channel(
-                        ch_data["name"],
-                        slowmode_delay=ch_data["slowmode_delay"],
-                        nsfw=ch_data["nsfw"],
-                        position=ch_data["position"]
-                    )
-                elif ch_data["type"] == "voice":
-                    await ctx.guild.create_voice_channel(
-                        ch_data["name"],
-                        bitrate=ch_data["bitrate"],
-                        user_limit=ch_data["user_limit"],
-                        position=ch_data["position"]
-                    )
+            restore_plan = server_restore.plan(ctx.guild, data)
+            deletes_here = any(ch.id == ctx.channel.id for ch in restore_plan.delete)
+            status = None
+            if not deletes_here:
+                status = await ctx.send(embed=make_embed(
+                    f"<a:clock:1401933869804032061> Restoring server : **{len(restore_plan.create_categories) + len(restore_plan.create_channels)}** to create | "
+                    f"**{len(restore_plan.edit)}** to edit | **{len(restore_plan.delete)}** to delete",
+                    discord.Color.orange()
+                ))
+            ok, failed = await server_restore.apply(
+                ctx.guild, bot.http, restore_plan,
+                progress=progress_updater(status, "Restoring", unit="changes") if status else None
+            )
 
-            await ctx.send(embed=make_embed("<:Ok:1401589649088057425> Server restored", discord.Color.green()))
+            result = make_embed(
+                f"<:Ok:1401589649088057425> Server restored **{ok} Changes applied | {failed} Failed**",
+                discord.Color.green()
+            )
+            # the command channel may have been removed by the restore
+            try:
+                if status:
+                    await status.edit(embed=result)
+                else:
+                    await ctx.author.send(embed=result)
+            except discord.HTTPException:
+                pass
         else:
             await ctx.send(embed=make_embed("<:warning:1401590117499408434> Unknown action for server backup.", discord.Color.orange()))
 
     else:
-        await ctx.send(embed=make_embed("<:warning:1401590117499408434> Unknown target. Use `users`, `server` or `status`.", discord.Color.orange()))
+        await ctx.send(embed=make_embed("<:warning:1401590117499408434> Unknown target. Use `users`, `server`, `schedule` or `status`.", discord.Color.orange()))
 # ===================== AUTOREACT =====================
 
+CUSTOM_EMOJI = re.compile(r"<(a?):(\w+):(\d+)>")
+
+async def steal_all(ctx, limit):
+    # every distinct custom emoji in the last `limit` messages that this guild doesn't have yet
+    found = {}
+    async for msg in ctx.channel.history(limit=limit, before=ctx.message):
+        for animated, name, emoji_id in CUSTOM_EMOJI.findall(msg.content):
+            found.setdefault(int(emoji_id), (name, bool(animated)))
+    have = {e.id for e in ctx.guild.emojis}
+    wanted = [(eid, name, animated) for eid, (name, animated) in found.items() if eid not in have]
+    if not wanted:
+        await ctx.send(embed=make_embed("<:warning:1401590117499408434> No new custom emojis found.", discord.Color.dark_gray()))
+        return
+
+    # static and animated emojis have separate slot limits
+    free = {
+        False: ctx.guild.emoji_limit - sum(1 for e in ctx.guild.emojis if not e.animated),
+        True: ctx.guild.emoji_limit - sum(1 for e in ctx.guild.emojis if e.animated),
+    }
+    selected = []
+    for eid, name, animated in wanted:
+        if free[animated] > 0:
+            free[animated] -= 1
+            selected.append((eid, name, animated))
+    no_slot = len(wanted) - len(selected)
+
+    status = await ctx.send(embed=make_embed(
+        f"<a:clock:1401933869804032061> Downloading **{len(selected)}** emojis . . .", discord.Color.orange()
+    ))
+    sem = asyncio.Semaphore(8)
+
+    async def download(eid, animated):
+        ext = "gif" if animated else "png"
+        async with sem:
+            try:
+                return await emoji_cache.fetch(http_pool, f"{eid}.{ext}", f"https://cdn.discordapp.com/emojis/{eid}.{ext}")
+            except Exception:
+                return None
+
+    images = await asyncio.gather(*(download(eid, animated) for eid, _, animated in selected))
+
+    # emoji creation has its own tight rate limit, so these go one at a time
+    added = []
+    failed = 0
+    for (eid, name, animated), data in zip(selected, images):
+        if data is None:
+            failed += 1
+            continue
+        if "discord.gg" in name.lower() or ".gg/" in name.lower():
+            name = random_name()
+        try:
+            added.append(await ctx.guild.create_custom_emoji(name=name, image=data, reason=f"Stolen by {ctx.author}"))
+        except discord.HTTPException:
+            failed += 1
+
+    preview = " ".join(str(e) for e in added[:40])
+    if len(added) > 40:
+        preview += f" … (+{len(added) - 40})"
+    await status.edit(embed=discord.Embed(
+        title="Steal",
+        description=(
+            f"**Added** : {len(added)} | **Failed** : {failed} | **No slots** : {no_slot}\n"
+            f"**Scanned** : {limit} messages\n\n"
+            f"{preview}"
+        ),
+        color=discord.Color.dark_gray()
+    ))
+
 @bot.command()
-async def steal(ctx, action=None):
+async def steal(ctx, action=None, limit: int = 50):
+    if action == "all":
+        if not ctx.author.guild_permissions.manage_emojis:
+            await ctx.send(embed=make_embed("<:warning:1401590117499408434> You’re missing permission: manage_emojis", discord.Color.orange()))
+            return
+        await steal_all(ctx, max(1, min(limit, 500)))
+        return
+
     async for msg in ctx.channel.history(limit=2):
         if msg == ctx.message:
             continue
@@ -640,25 +1014,24 @@ async def steal(ctx, action=None):
             await ctx.send(embed=embed)
             return
 
-        match = re.search(r"<(a?):(\w+):(\d+)>", msg.content)
+        match = CUSTOM_EMOJI.search(msg.content)
         if match:
             animated = bool(match.group(1))
             emoji_name = match.group(2)
             emoji_id = match.group(3)
             ext = "gif" if animated else "png"
             url = f"https://cdn.discordapp.com/emojis/{emoji_id}.{ext}"
+            cache_key = f"{emoji_id}.{ext}"
 
             if action == "apply":
                 if "discord.gg" in emoji_name.lower() or ".gg/" in emoji_name.lower():
                     emoji_name = random_name()
 
                 try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(url) as resp:
-                            if resp.status != 200:
-                                await ctx.send(embed=make_embed(f"<:warning:1401590117499408434> Failed to download emoji image.", discord.Color.orange()))
-                                return
-                            data = await resp.read()
+                    data = await emoji_cache.fetch(http_pool, cache_key, url)
+                    if data is None:
+                        await ctx.send(embed=make_embed(f"<:warning:1401590117499408434> Failed to download emoji image.", discord.Color.orange()))
+                        return
 
                     new_emoji = await ctx.guild.create_custom_emoji(name=emoji_name, image=data)
                     embed = discord.Embed(
@@ -687,6 +1060,8 @@ async def steal(ctx, action=None):
                 )
                 embed.set_image(url=url)
                 await ctx.send(embed=embed)
+                # warm the cache so a following `steal apply` skips the download
+                emoji_cache.warm(http_pool, cache_key, url)
                 return
 
     await ctx.send(embed=make_embed("<:warning:1401590117499408434> No sticker or custom emoji found in the last message.", discord.Color.dark_gray()))
@@ -699,15 +1074,10 @@ async def autoreact(ctx, *args):
 
     # list
     if len(args) == 1 and args[0].lower() == "list":
-        items = []
-        for uid, emoji in config.items():
-            # only numeric keys correspond to autoreact user entries (others are config keys)
-            if uid.isdigit():
-                try:
-                    user = await bot.fetch_user(int(uid))
-                    items.append(f"{user.name}#{user.discriminator} → {emoji}")
-                except Exception:
-                    items.append(f"{uid} → {emoji}")
+        # only numeric keys correspond to autoreact user entries (others are config keys)
+        entries = [(uid, emoji) for uid, emoji in config.items() if uid.isdigit()]
+        names = await name_resolver.names(ctx.guild, [uid for uid, _ in entries])
+        items = [f"{names[int(uid)]} → {emoji}" for uid, emoji in entries]
         desc = "\n".join(items) or "*No autoreacts set.*"
         return await ctx.send(embed=make_embed(desc, discord.Color.dark_grey(), title="AutoReacts"))
 
@@ -717,7 +1087,7 @@ async def autoreact(ctx, *args):
         for k in config_keys:
             if k.isdigit():
                 config.pop(k, None)
-        await save_data()
+        await save_data(ctx.guild.id)
         return await ctx.send(embed=make_embed("<:Ok:1401589649088057425> Removed all auto reacts.", discord.Color.green()))
 
     if len(args) < 2:
@@ -728,13 +1098,22 @@ async def autoreact(ctx, *args):
         )
         return await ctx.send(embed=embed)
 
-    emoji = args[0]
     try:
         member = await commands.MemberConverter().convert(ctx, args[1])
     except commands.BadArgument:
         return await ctx.send(embed=make_embed("<:error:1401589697477742742> Invalid user.", discord.Color.red()))
 
     user_id = str(member.id)
+    emoji = args[0]
+
+    if user_id not in config:
+        # reacting to the command message proves the emoji is usable before it's stored
+        partial = discord.PartialEmoji.from_str(emoji)
+        try:
+            await ctx.message.add_reaction(partial)
+        except discord.HTTPException:
+            return await ctx.send(embed=make_embed("<:error:1401589697477742742> Invalid emoji or I can't use it.", discord.Color.red()))
+        emoji = str(partial)
 
     if user_id in config:
         # remove mapping
@@ -744,7 +1123,7 @@ async def autoreact(ctx, *args):
         config[user_id] = emoji
         embed = make_embed(f"<:Ok:1401589649088057425> Auto reacting with {emoji} to {member.mention}", discord.Color.green())
 
-    await save_data()
+    await save_data(ctx.guild.id)
     await ctx.send(embed=embed)
 
 # ===================== ANTIRAID =====================
@@ -791,7 +1170,7 @@ async def antiraid(ctx, mode: str = None, state: str = None, *, options: str = N
 
         if state.lower() == "off":
             auto_react_data[guild_id]["antiraid"]["spam"] = {"enabled": False, "action": None}
-            await save_data()
+            await save_data(ctx.guild.id)
             return await ctx.send(embed=discord.Embed(
                 description="<:Ok:1401589649088057425> Anti-raid spam disabled.",
                 color=discord.Color.green()
@@ -805,7 +1184,7 @@ async def antiraid(ctx, mode: str = None, state: str = None, *, options: str = N
             return await ctx.send(embed=error_embed)
 
         auto_react_data[guild_id]["antiraid"]["spam"] = {"enabled": True, "action": action}
-        await save_data()
+        await save_data(ctx.guild.id)
         return await ctx.send(embed=discord.Embed(
             description=f"<:Ok:1401589649088057425> Anti-raid spam enabled — action: **{action}**",
             color=discord.Color.green()
@@ -821,16 +1200,9 @@ async def antiraid(ctx, mode: str = None, state: str = None, *, options: str = N
         if state.lower() == "off":
             # Rollback to previous permissions
             previous_perms = auto_react_data[guild_id]["antiraid"]["external_app"].get("previous_perms", {})
-            for ch_id, old_value in previous_perms.items():
-                ch = ctx.guild.get_channel(int(ch_id))
-                if not ch:
-                    continue
-                try:
-                    current_overwrites = ch.overwrites_for(target_role)
-                    current_overwrites.update(use_external_apps=old_value)
-                    await ch.set_permissions(target_role, overwrite=current_overwrites)
-                except discord.Forbidden:
-                    pass
+            if previous_perms:
+                status = await ctx.send(embed=make_embed("<a:clock:1401933869804032061> Restoring permissions . . .", discord.Color.orange()))
+                await roll_back(ctx.guild, target_role, previous_perms, progress=progress_updater(status, "Restoring permissions"))
 
             auto_react_data[guild_id]["antiraid"]["external_app"] = {
                 "enabled": False,
@@ -838,7 +1210,7 @@ async def antiraid(ctx, mode: str = None, state: str = None, *, options: str = N
                 "channels": [],
                 "previous_perms": {}
             }
-            await save_data()
+            await save_data(ctx.guild.id)
 
             return await ctx.send(embed=discord.Embed(
                 description="<:Ok:1401589649088057425> External app blocking disabled and permissions restored.",
@@ -861,35 +1233,28 @@ async def antiraid(ctx, mode: str = None, state: str = None, *, options: str = N
         if action not in ["ban", "kick", "mute"] or not channels_param:
             return await ctx.send(embed=error_embed)
 
-        channels_list = []
-        previous_perms = {}
-
         # Apply safe permission changes
         if channels_param.lower() == "all":
-            for ch in ctx.guild.channels:
-                try:
-                    current_overwrites = ch.overwrites_for(target_role)
-                    previous_perms[str(ch.id)] = current_overwrites.use_external_apps
-                    current_overwrites.update(use_external_apps=False)
-                    await ch.set_permissions(target_role, overwrite=current_overwrites)
-                except discord.Forbidden:
-                    pass
+            channels = ctx.guild.channels
             channels_list = ["all"]
         else:
             try:
                 channel_id = int(channels_param)
-                ch = ctx.guild.get_channel(channel_id)
-                if not ch:
-                    return await ctx.send(embed=error_embed)
-
-                current_overwrites = ch.overwrites_for(target_role)
-                previous_perms[str(ch.id)] = current_overwrites.use_external_apps
-                current_overwrites.update(use_external_apps=False)
-                await ch.set_permissions(target_role, overwrite=current_overwrites)
-
-                channels_list = [channel_id]
             except ValueError:
                 return await ctx.send(embed=error_embed)
+            ch = ctx.guild.get_channel(channel_id)
+            if not ch:
+                return await ctx.send(embed=error_embed)
+            channels = [ch]
+            channels_list = [channel_id]
+
+        status = await ctx.send(embed=make_embed("<a:clock:1401933869804032061> Blocking external apps . . .", discord.Color.orange()))
+        previous_perms = await fan_out(
+            channels, target_role, {"use_external_apps": False},
+            progress=progress_updater(status, "Blocking external apps")
+        )
+        # keep the values recorded by an earlier `on` so rollback restores the originals
+        previous_perms.update(auto_react_data[guild_id]["antiraid"]["external_app"].get("previous_perms", {}))
 
         auto_react_data[guild_id]["antiraid"]["external_app"] = {
             "enabled": True,
@@ -897,7 +1262,7 @@ async def antiraid(ctx, mode: str = None, state: str = None, *, options: str = N
             "channels": channels_list,
             "previous_perms": previous_perms
         }
-        await save_data()
+        await save_data(ctx.guild.id)
 
         return await ctx.send(embed=discord.Embed(
             description=f"<:Ok:1401589649088057425> External app blocking enabled in `{channels_param}` — action: **{action}**",
@@ -939,17 +1304,11 @@ async def forcenickname(ctx, *args):
         end = start + per_page
         entries = items[start:end]
 
+        users = await name_resolver.resolve(ctx.guild, [user_id for user_id, _ in entries])
         desc = ""
         for i, (user_id, nick) in enumerate(entries, start=1 + start):
-            user = ctx.guild.get_member(int(user_id))
-            if user:
-                name = user.name
-            else:
-                try:
-                    user_obj = await bot.fetch_user(int(user_id))
-                    name = user_obj.name
-                except:
-                    name = f"Unknown User ({user_id})"
+            user = users[int(user_id)]
+            name = user.name if user else f"Unknown User ({user_id})"
             desc += f"{i}. {name} → `{nick}`\n"
 
         embed = discord.Embed(
@@ -984,7 +1343,7 @@ async def forcenickname(ctx, *args):
     if nickname.lower() == "off":
         if user_id in forcenicks:
             del forcenicks[user_id]
-            await save_data()
+            await save_data(ctx.guild.id)
             return await ctx.send(embed=make_embed(f"<:error:1401589697477742742> No longer forcing nickname for {member.mention}", discord.Color.orange()))
         else:
             return await ctx.send(embed=make_embed(f"<:warning:1401590117499408434> No forced nickname was set for {member.mention}", discord.Color.orange()))
@@ -993,7 +1352,7 @@ async def forcenickname(ctx, *args):
         return await ctx.send(embed=make_embed(f"<:warning:1401590117499408434> Nickname too long. Max 32 characters.", discord.Color.red()))
 
     forcenicks[user_id] = nickname
-    await save_data()
+    await save_data(ctx.guild.id)
 
     try:
         if member.nick != nickname:
@@ -1012,7 +1371,7 @@ async def forcenickname(ctx, *args):
 async def nsfw(ctx, sub=None, action=None, *, value=None):
     data = load_filter()
 
-    if not os.path.exists(NSFW_FILTER_FILE):
+    if data is None:
         embed = discord.Embed(
             description="<:files:1403754002989973566> no file detected **module can’t operate**",
             color=discord.Color.orange()
@@ -1048,7 +1407,7 @@ async def nsfw(ctx, sub=None, action=None, *, value=None):
             punishment = "mute"
             if value and value.lower().startswith("do:"):
                 val = value.split("do:")[-1].strip().lower()
-                if val in ["mute", "kick", "ban", "timeout"]:
+                if val in PUNISHMENTS:
                     punishment = val
                 else:
                     await ctx.send(embed=discord.Embed(
@@ -1056,8 +1415,8 @@ async def nsfw(ctx, sub=None, action=None, *, value=None):
                         color=discord.Color.orange()
                     ))
                     return
-            data["enabled"] = True
-            data["action"] = punishment
+            data.enabled = True
+            data.punishment = punishment
             save_filter(data)
             await ctx.send(embed=discord.Embed(
                 description=f"<:Ok:1401589649088057425> NSFW filter enabled — action: **{punishment}**",
@@ -1066,7 +1425,7 @@ async def nsfw(ctx, sub=None, action=None, *, value=None):
             return
 
         if action and action.lower() == "off":
-            data["enabled"] = False
+            data.enabled = False
             save_filter(data)
             await ctx.send(embed=discord.Embed(
                 description="<:error:1401589697477742742> **NSFW filter disabled**",
@@ -1076,8 +1435,8 @@ async def nsfw(ctx, sub=None, action=None, *, value=None):
 
         if action and action.lower() == "add" and value:
             word = value.lower()
-            if word not in data["words"]:
-                data["words"].append(word)
+            if word not in data.words:
+                data.words.append(word)
                 save_filter(data)
                 await ctx.send(embed=discord.Embed(
                     description=f"<:Ok:1401589649088057425> Added `'{word}'` to **filtered list**",
@@ -1092,8 +1451,8 @@ async def nsfw(ctx, sub=None, action=None, *, value=None):
 
         if action and action.lower() == "remove" and value:
             word = value.lower()
-            if word in data["words"]:
-                data["words"].remove(word)
+            if word in data.words:
+                data.words.remove(word)
                 save_filter(data)
                 await ctx.send(embed=discord.Embed(
                     description=f"<:error:1401589697477742742> Removed `{word}` from **filtered list**",
@@ -1107,7 +1466,7 @@ async def nsfw(ctx, sub=None, action=None, *, value=None):
             return
 
         if action and action.lower() == "list":
-            words = data["words"]
+            words = data.words
             if not words:
                 await ctx.send(embed=discord.Embed(
                     description="<:warning:1401590117499408434> No words in **filter list**.",
@@ -1153,23 +1512,23 @@ async def nsfw(ctx, sub=None, action=None, *, value=None):
             return
 
         if action and action.lower() == "strict":
-            data["strict"] = not data.get("strict", False)
+            data.strict = not data.strict
             save_filter(data)
-            status = "strict" if data["strict"] else "standart"
+            status = "strict" if data.strict else "standart"
             await ctx.send(embed=discord.Embed(
                 description=f"<:Ok:1401589649088057425> NSFW filter set to **{status}**",
                 color=discord.Color.green()
             ))
             return
 
-        if action and action.lower() == "exempt" and ctx.message.mentions:
-            target = ctx.message.mentions[0]
+        if action and action.lower() == "exempt" and (ctx.message.mentions or ctx.message.role_mentions):
+            target = (ctx.message.mentions or ctx.message.role_mentions)[0]
             if isinstance(target, discord.Member):
-                if target.id not in data.get("exempt_users", []):
-                    data["exempt_users"].append(target.id)
+                if target.id not in data.exempt_users:
+                    data.exempt_users.append(target.id)
             elif isinstance(target, discord.Role):
-                if target.id not in data.get("exempt_roles", []):
-                    data["exempt_roles"].append(target.id)
+                if target.id not in data.exempt_roles:
+                    data.exempt_roles.append(target.id)
             save_filter(data)
             await ctx.send(embed=discord.Embed(
                 description=f"<:Ok:1401589649088057425> {target.mention} exempted from NSFW filter",
@@ -1181,12 +1540,11 @@ async def nsfw(ctx, sub=None, action=None, *, value=None):
     # DOXX COMMAND
     # ----------------------------
     if sub.lower() == "doxx":
-        data.setdefault("doxx", {})
         if action and action.lower() == "on":
             punishment = "timeout"
             if value and value.lower().startswith("do:"):
                 val = value.split("do:")[-1].strip().lower()
-                if val in ["mute", "kick", "ban", "timeout"]:
+                if val in PUNISHMENTS:
                     punishment = val
                 else:
                     await ctx.send(embed=discord.Embed(
@@ -1194,8 +1552,8 @@ async def nsfw(ctx, sub=None, action=None, *, value=None):
                         color=discord.Color.orange()
                     ))
                     return
-            data["doxx"]["enabled"] = True
-            data["doxx"]["punishment"] = punishment
+            data.doxx.enabled = True
+            data.doxx.punishment = punishment
             save_filter(data)
             await ctx.send(embed=discord.Embed(
                 description=f"<:Ok:1401589649088057425> Anti-Doxxing enabled — action: **{punishment}**",
@@ -1203,7 +1561,7 @@ async def nsfw(ctx, sub=None, action=None, *, value=None):
             ))
             return
         elif action and action.lower() == "off":
-            data["doxx"]["enabled"] = False
+            data.doxx.enabled = False
             save_filter(data)
             await ctx.send(embed=discord.Embed(
                 description="<:error:1401589697477742742> **Anti-Doxxing disabled**",
@@ -1215,28 +1573,28 @@ async def nsfw(ctx, sub=None, action=None, *, value=None):
     # CONFIG STATUS
     # ----------------------------
     if sub.lower() == "config":
-        enabled_icon = "<:enabled:1404451260052144228>" if data.get("enabled") else "<:disabled:1404450164118126683>"
-        strict_icon = "<:enabled:1404451260052144228>" if data.get("strict") else "<:disabled:1404450164118126683>"
-        doxx_icon = "<:enabled:1404451260052144228>" if data.get("doxx", {}).get("enabled") else "<:disabled:1404450164118126683>"
+        enabled_icon = "<:enabled:1404451260052144228>" if data.enabled else "<:disabled:1404450164118126683>"
+        strict_icon = "<:enabled:1404451260052144228>" if data.strict else "<:disabled:1404450164118126683>"
+        doxx_icon = "<:enabled:1404451260052144228>" if data.doxx.enabled else "<:disabled:1404450164118126683>"
 
-        exempt_roles_count = len(data.get("exempt_roles", []))
-        exempt_users_count = len(data.get("exempt_users", []))
-        filtered_words_count = len(data.get("words", []))
+        exempt_roles_count = len(data.exempt_roles)
+        exempt_users_count = len(data.exempt_users)
+        filtered_words_count = len(data.words)
 
         role_exemption_icon = "<:enabled:1404451260052144228>" if exempt_roles_count > 0 else "<:disabled:1404450164118126683>"
         user_exemption_icon = "<:enabled:1404451260052144228>" if exempt_users_count > 0 else "<:disabled:1404450164118126683>"
 
         embed = discord.Embed(
             description=(
-                f"NSFW filter is **{'enabled' if data.get('enabled') else 'disabled'}**\n\n"
+                f"NSFW filter is **{'enabled' if data.enabled else 'disabled'}**\n\n"
                 f"**Strict Filter** : {strict_icon}\n"
                 f"**Role exemption** : {role_exemption_icon}\n"
                 f"**User exemption** : {user_exemption_icon}\n"
                 f"**Exempted Roles** : {exempt_roles_count}\n"
                 f"**Exempted Users** : {exempt_users_count}\n"
                 f"**Filtered Words** : {filtered_words_count}\n"
-                f"**Action on NSFW** : {data.get('action', 'mute')}\n"
-                f"**Anti-Doxxing** : {doxx_icon} (action: {data.get('doxx', {}).get('punishment', 'timeout')})"
+                f"**Action on NSFW** : {data.punishment}\n"
+                f"**Anti-Doxxing** : {doxx_icon} (action: {data.doxx.punishment})"
             ),
             color=discord.Color.light_grey()
         )
@@ -1281,13 +1639,13 @@ async def autoremove(ctx, *args):
         if off_flag:
             if user_id in config["autoremove_messages"]:
                 del config["autoremove_messages"][user_id]
-                await save_data()
+                await save_data(ctx.guild.id)
                 await ctx.send(embed=make_embed(f"<:Ok:1401589649088057425> Stopped autoremove messages for {member.mention}", discord.Color.green()))
             else:
                 await ctx.send(embed=make_embed(f"<:warning:1401590117499408434> No autoremove messages set for {member.mention}", discord.Color.orange()))
         else:
             config["autoremove_messages"][user_id] = True
-            await save_data()
+            await save_data(ctx.guild.id)
             await ctx.send(embed=make_embed(f"<:Ok:1401589649088057425> Now autoremoving messages from {member.mention}", discord.Color.green()))
 
     elif mode == "reactions":
@@ -1333,7 +1691,7 @@ async def autoremove(ctx, *args):
                 for key in keys_to_remove:
                     del config["autoremove_reactions"][key]
                 if removed_any:
-                    await save_data()
+                    await save_data(ctx.guild.id)
                     await ctx.send(embed=make_embed(f"<:Ok:1401589649088057425> Stopped autoremove reactions for all emojis from {member.mention}", discord.Color.green()))
                 else:
                     await ctx.send(embed=make_embed(f"<:warning:1401590117499408434> No autoremove reactions set for {member.mention}", discord.Color.orange()))
@@ -1341,7 +1699,7 @@ async def autoremove(ctx, *args):
                 key = f"{user_id}:{emoji}"
                 if key in config["autoremove_reactions"]:
                     del config["autoremove_reactions"][key]
-                    await save_data()
+                    await save_data(ctx.guild.id)
                     await ctx.send(embed=make_embed(f"<:Ok:1401589649088057425> Stopped autoremove reactions {emoji} from {member.mention}", discord.Color.green()))
                 else:
                     await ctx.send(embed=make_embed(f"<:warning:1401590117499408434> No autoremove reaction {emoji} set for {member.mention}", discord.Color.orange()))
@@ -1351,7 +1709,7 @@ async def autoremove(ctx, *args):
                 return
             key = f"{user_id}:{emoji}"
             config["autoremove_reactions"][key] = True
-            await save_data()
+            await save_data(ctx.guild.id)
             await ctx.send(embed=make_embed(f"<:Ok:1401589649088057425> Now autoremoving reaction {emoji} from {member.mention}", discord.Color.green()))
 
     else:
@@ -1365,191 +1723,64 @@ async def on_message(message):
 
     now = time.time()
     user_id = str(message.author.id)
-    guild_id = str(message.guild.id)
-
-    # --- AUTO-REACT ---
-    config = auto_react_data.get(guild_id, {})
-    emoji_react = config.get(user_id)
-    if emoji_react:
-        try:
-            await message.add_reaction(emoji_react)
-        except:
-            pass
-
-    # --- MESSAGE HISTORY (SLIDING WINDOW) ---
-    timestamps = message_history[user_id]
-    timestamps = [t for t in timestamps if now - t <= 5]
-    timestamps.append(now)
-    message_history[user_id] = timestamps
-
-    # --- ANTI-RAID SPAM ---
-    if config.get("antiraid_spam_enabled") and len(timestamps) >= 5:
-        action = config.get("antiraid_spam_action")
-        reason = "User triggered anti-raid"
-        try:
-            if action == "mute":
-                role = discord.utils.get(message.guild.roles, name="Muted")
-                if not role:
-                    role = await message.guild.create_role(name="Muted")
-                    for channel in message.guild.channels:
-                        try:
-                            await channel.set_permissions(role, send_messages=False, add_reactions=False)
-                        except:
-                            pass
-                try:
-                    await message.author.add_roles(role, reason=reason)
-                except:
-                    pass
-            elif action == "kick" and message.guild.me.guild_permissions.kick_members:
-                try:
-                    await message.author.kick(reason=reason)
-                except:
-                    pass
-            elif action == "ban" and message.guild.me.guild_permissions.ban_members:
-                try:
-                    await message.guild.ban(message.author, reason=reason)
-                except:
-                    pass
-        except:
-            pass
-        message_history[user_id] = []
+    policy = get_policy(message.guild.id)
+
+    # guilds without autoreact / anti-raid / autoremove skip straight to the filters
+    if policy.on_message:
+        # --- AUTO-REACT ---
+        emoji_react = policy.autoreact.get(message.author.id)
+        if emoji_react:
+            reaction_queue.add(message, emoji_react)
+
+        # --- ANTI-RAID SPAM ---
+        if policy.spam_action:
+            # --- MESSAGE HISTORY (SLIDING WINDOW) ---
+            if spam_tracker.hit(message.guild.id, message.author.id, now):
+                if policy.spam_action == "ban":
+                    raid_batcher.add(message.author, "User triggered anti-raid")
+                else:
+                    enforcer.punish(message.author, policy.spam_action, "User triggered anti-raid", create_mute_role=True)
+                spam_tracker.reset(message.guild.id, message.author.id)
 
-    # --- AUTOREMOVE MESSAGES ---
-    if config.get("autoremove_messages", {}).get(user_id):
-        try:
-            await message.delete()
-        except:
-            pass
+        # --- AUTOREMOVE MESSAGES ---
+        if message.author.id in policy.autoremove_messages:
+            enforcer.delete(message)
 
     # --- LOAD NSFW FILTER ---
-    nsfw_file = "modules/nsfw_filter.json"
-    if os.path.exists(nsfw_file):
-        try:
-            with open(nsfw_file, "r") as f:
-                nsfw_data = json.load(f)
-        except:
-            nsfw_data = {}
-
+    nsfw_data = load_filter()
+    if nsfw_data is not None:
         # --- NSFW FILTER ---
-        if nsfw_data.get("enabled", False):
-            if user_id not in nsfw_data.get("exempt_users", []) and not any(
-                str(r.id) in nsfw_data.get("exempt_roles", []) for r in message.author.roles
-            ):
-                filtered_words = nsfw_data.get("words", [])
-                text_content = message.content
-
-                if nsfw_data.get("strict", False):
-                    normalized_text = re.sub(r'[^a-zA-Z0-9]', '', text_content.lower())
-                    match = any(
-                        re.sub(r'\s+|[^a-zA-Z0-9]', '', word.lower()) in normalized_text
-                        for word in filtered_words
-                    )
-                else:
-                    match = any(word.lower() in text_content.lower() for word in filtered_words)
-
-                if match:
-                    try:
-                        await message.delete()
-                    except:
-                        pass
+        if nsfw_data.enabled:
+            if not exemption_cache.is_exempt(nsfw_data, message.author):
+                if nsfw_data.matches(message.content):
+                    enforcer.delete(message)
 
-                    # Track offenses
-                    user_offenses = nsfw_data.setdefault("offenses", {})
-                    user_entry = user_offenses.setdefault(user_id, [])
-                    user_entry = [t for t in user_entry if now - t <= 600]  # 10 min
-                    user_entry.append(now)
-                    nsfw_data["offenses"][user_id] = user_entry
+                    # Track offenses (10 min window)
+                    strikes = offense_store.record("nsfw", user_id, now)
 
                     # Punishment if needed
-                    if len(user_entry) >= 5:
-                        punishment = nsfw_data.get("punishment", "timeout")
-                        reason = "NSFW filter triggered 5 times in 10 minutes"
-
-                        try:
-                            if punishment == "mute":
-                                mute_role = discord.utils.get(message.guild.roles, name="Muted")
-                                if mute_role:
-                                    await message.author.add_roles(mute_role, reason=reason)
-                                else:
-                                    await message.author.timeout(
-                                        discord.utils.utcnow() + datetime.timedelta(minutes=5),
-                                        reason=reason
-                                    )
-                            elif punishment == "timeout":
-                                await message.author.timeout(
-                                    discord.utils.utcnow() + datetime.timedelta(minutes=5),
-                                    reason=reason
-                                )
-                            elif punishment == "kick":
-                                await message.author.kick(reason=reason)
-                            elif punishment == "ban":
-                                await message.guild.ban(message.author, reason=reason)
-                        except:
-                            pass
-
-                        nsfw_data["offenses"][user_id] = []
+                    if strikes >= 5:
+                        enforcer.punish(message.author, nsfw_data.punishment, "NSFW filter triggered 5 times in 10 minutes")
+                        offense_store.reset("nsfw", user_id)
 
         # --- ANTI-DOXX ---
-        doxx_cfg = nsfw_data.get("doxx", {})
-        if doxx_cfg.get("enabled", False):
+        doxx_cfg = nsfw_data.doxx
+        if doxx_cfg.enabled:
             # Skip exempt users/roles
-            if user_id not in nsfw_data.get("exempt_users", []) and not any(
-                str(r.id) in nsfw_data.get("exempt_roles", []) for r in message.author.roles
-            ):
-                phone_match = re.search(r"(\+?\d{1,3}?[-.\s]??\(?\d{1,4}?\)?[-.\s]??\d{1,4}[-.\s]??\d{1,9})", message.content)
-                email_match = re.search(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", message.content)
-                address_match = re.search(
-                    r"\b([A-Z][a-z]+(?:\s+(street|st|road|rd|avenue|ave|boulevard|blvd|lane|ln|drive|dr|way|court|ct|plaza|platz|place|allee|weg|strasse|straße|str\.))\s?\d{1,4})\b",
-                    message.content, re.IGNORECASE
-                )
-
-                if phone_match or email_match or address_match:
-                    offenses = doxx_cfg.setdefault("offenses", {})
-                    user_entry = offenses.setdefault(user_id, [])
-                    user_entry = [t for t in user_entry if now - t <= 7*24*3600]  # 7 Tage
-                    user_entry.append(now)
-                    offenses[user_id] = user_entry
-                    nsfw_data["doxx"] = doxx_cfg
-
-                    reason = "Doxxing detected (phone/email/address)"
-                    try:
-                        if len(user_entry) >= 4:
-                            # Wiederholungstäter → 7 Tage Timeout
-                            await message.author.timeout(
-                                discord.utils.utcnow() + datetime.timedelta(days=7),
-                                reason="Repeated doxxing — 1 week timeout"
-                            )
-                        else:
-                            punishment = doxx_cfg.get("punishment", "timeout")
-                            if punishment == "mute":
-                                mute_role = discord.utils.get(message.guild.roles, name="Muted")
-                                if mute_role:
-                                    await message.author.add_roles(mute_role, reason=reason)
-                                else:
-                                    await message.author.timeout(
-                                        discord.utils.utcnow() + datetime.timedelta(minutes=5),
-                                        reason=reason
-                                    )
-                            elif punishment == "timeout":
-                                await message.author.timeout(
-                                    discord.utils.utcnow() + datetime.timedelta(minutes=5),
-                                    reason=reason
-                                )
-                            elif punishment == "kick":
-                                await message.author.kick(reason=reason)
-                            elif punishment == "ban":
-                                await message.guild.ban(message.author, reason=reason)
-                    except:
-                        pass
-
-                    try:
-                        await message.delete()
-                    except:
-                        pass
-
-        # --- SAVE NSFW DATA ---
-        with open(nsfw_file, "w") as f:
-            json.dump(nsfw_data, f, indent=4)
+            if not exemption_cache.is_exempt(nsfw_data, message.author):
+                doxx_kind = doxx_detector.detect(message.content)
+                if doxx_kind:
+                    strikes = offense_store.record("doxx", user_id, now)  # 7 Tage
+
+                    if strikes >= 4:
+                        # Wiederholungstäter → 7 Tage Timeout
+                        enforcer.punish(
+                            message.author, "timeout", "Repeated doxxing — 1 week timeout",
+                            duration=datetime.timedelta(days=7)
+                        )
+                    else:
+                        enforcer.punish(message.author, doxx_cfg.punishment, f"Doxxing detected ({doxx_kind})")
+                    enforcer.delete(message)
 
     await bot.process_commands(message)
 # ===================== ON RAW REACTION ADD =====================
@@ -1560,27 +1791,17 @@ async def on_raw_reaction_add(payload):
         return
     if payload.guild_id is None:
         return
-    guild_id = str(payload.guild_id)
-    config = auto_react_data.get(guild_id, {})
-    if not config:
+    # users without autoremove entries return here without allocating anything
+    emojis = get_policy(payload.guild_id).autoremove_reactions.get(payload.user_id)
+    if not emojis:
         return
 
-    user_id = str(payload.user_id)
-    autoremove_reactions = config.get("autoremove_reactions", {})
-
-    emoji_str = str(payload.emoji)
-    key = f"{user_id}:{emoji_str}"
-
-    if key in autoremove_reactions:
-        channel = bot.get_channel(payload.channel_id)
-        if not channel:
-            return
+    if emoji_key(payload.emoji) in emojis:
+        # one DELETE from the payload's ids; no message or user fetch needed
+        message = bot.get_partial_messageable(payload.channel_id, guild_id=payload.guild_id).get_partial_message(payload.message_id)
         try:
-            message = await channel.fetch_message(payload.message_id)
-            # payload.member is available for intents.members; fallback to fetch_user
-            user = payload.member or await bot.fetch_user(payload.user_id)
-            await message.remove_reaction(payload.emoji, user)
-        except Exception:
+            await message.remove_reaction(payload.emoji, discord.Object(id=payload.user_id))
+        except discord.HTTPException:
             pass
 
 # ===================== LOG COMMAND (kept as requested) =====================
@@ -1598,12 +1819,13 @@ async def log(ctx, target: str = None):
             description="Syntax: `$log #channel` `$log <webhook_url>`",
             color=discord.Color.blurple()
         )
+        embed.set_footer(text=f"Queued : {len(mod_log)} | Dropped : {mod_log.overflow} | Failed : {mod_log.failed}")
         return await ctx.send(embed=embed)
 
     if target.startswith("http"):  # Webhook URL
         config["log_webhook"] = target
         config.pop("log_channel", None)
-        await save_data()
+        await save_data(ctx.guild.id)
         embed = make_embed(f"<:Ok:1401589649088057425> Logging set to Webhook.", discord.Color.green())
         return await ctx.send(embed=embed)
 
@@ -1611,7 +1833,7 @@ async def log(ctx, target: str = None):
         channel = ctx.message.channel_mentions[0]
         config["log_channel"] = channel.id
         config.pop("log_webhook", None)
-        await save_data()
+        await save_data(ctx.guild.id)
         embed = make_embed(f"<:Ok:1401589649088057425> Logging set to {channel.mention}", discord.Color.green())
         return await ctx.send(embed=embed)
 
@@ -1633,11 +1855,9 @@ async def role_command(ctx, *args):
         blocks = auto_react_data.get(str(ctx.guild.id), {}).get("role_blocks", {})
         entries = []
         for role_id, user_ids in blocks.items():
-            for user_id in user_ids:
-                role = ctx.guild.get_role(int(role_id))
-                user = ctx.guild.get_member(int(user_id))
-                if role and user:
-                    entries.append(f"{role.mention} ⟶ {user.name}")
+            role = ctx.guild.get_role(int(role_id))
+            if role:
+                entries.extend((role, int(user_id)) for user_id in user_ids)
 
         page = 1
         if len(args) == 3 and args[2].isdigit():
@@ -1646,9 +1866,14 @@ async def role_command(ctx, *args):
         start = (page - 1) * 5
         end = start + 5
 
+        # only the users on this page are looked up
+        names = await name_resolver.names(ctx.guild, [user_id for _, user_id in entries[start:end]])
         embed = discord.Embed(
             title="Blocked Roles",
-            description="\n".join(f"{i+1}. {entry}" for i, entry in enumerate(entries[start:end], start=start)),
+            description="\n".join(
+                f"{i+1}. {role.mention} ⟶ {names[user_id]}"
+                for i, (role, user_id) in enumerate(entries[start:end], start=start)
+            ),
             color=discord.Color.greyple()
         )
         embed.set_footer(text=f"Page {page}/{total_pages} ({len(entries)} Blocks)")
@@ -1706,14 +1931,14 @@ async def role_command(ctx, *args):
                 role_blocks[role_id] = []
             if user_id not in role_blocks[role_id]:
                 role_blocks[role_id].append(user_id)
-            await save_data()
+            await save_data(ctx.guild.id)
             await ctx.send(embed=make_embed(f"<:Ok:1401589649088057425> Now blocking role {role.mention} from {member.mention}", discord.Color.green()))
         elif action == "unblock":
             if role_id in role_blocks and user_id in role_blocks[role_id]:
                 role_blocks[role_id].remove(user_id)
                 if not role_blocks[role_id]:
                     del role_blocks[role_id]
-                await save_data()
+                await save_data(ctx.guild.id)
                 await ctx.send(embed=make_embed(f"<:Ok:1401589649088057425> Removed block of {role.mention} from {member.mention}", discord.Color.green()))
             else:
                 await ctx.send(embed=make_embed(f"<:warning:1401590117499408434> No block found for {member.mention} and {role.mention}", discord.Color.orange()))
@@ -1725,13 +1950,18 @@ async def role_command(ctx, *args):
 # ===================== ON MEMBER UPDATE (enforce forcenick & role blocks) =====================
 @bot.event
 async def on_member_update(before, after):
-    # Forcenickname Enforcement
-    guild_id = str(after.guild.id)
-    config = auto_react_data.get(guild_id, {})
+    if before.roles != after.roles:
+        exemption_cache.invalidate(after.guild.id, after.id)
+        if not after.bot:
+            role_deltas.add(after)
+
+    policy = get_policy(after.guild.id)
+    if not policy.on_member_update:
+        return
 
-    forced_nicks = config.get("forcenicknames", {})
-    if str(after.id) in forced_nicks:
-        desired_nick = forced_nicks[str(after.id)]
+    # Forcenickname Enforcement
+    desired_nick = policy.forcenicks.get(after.id)
+    if desired_nick is not None:
         if after.nick != desired_nick:
             try:
                 await after.edit(nick=desired_nick, reason="Force nick enforcement set for user")
@@ -1741,9 +1971,9 @@ async def on_member_update(before, after):
                 print(f"[ForceNick] API error for {after.id}: {e}")
 
     # Role Block Enforcement
-    role_blocks = config.get("role_blocks", {})
-    for role in after.roles:
-        if str(role.id) in role_blocks and str(after.id) in role_blocks[str(role.id)]:
+    blocked_roles = policy.role_blocks.get(after.id, ())
+    for role in after.roles if blocked_roles else ():
+        if role.id in blocked_roles:
             try:
                 await after.remove_roles(role, reason="Role block enforcement set for user")
             except discord.Forbidden:
@@ -1758,29 +1988,30 @@ async def log_command(ctx):
     if not ctx.guild or ctx.command is None:
         return
 
-    guild_id = str(ctx.guild.id)
-    config = auto_react_data.get(guild_id, {})
-
     log_embed = discord.Embed(
         description=f"Moderator : {ctx.author.id}\nCommand : {ctx.message.content}\nTime : {discord.utils.format_dt(discord.utils.utcnow(), 'F')}",
         color=discord.Color.dark_grey()
     )
+    send_log(ctx.guild.id, log_embed)
+
+async def deliver_logs(guild_id, embeds):
+    # send up to 10 buffered embeds to the guild's configured log webhook or channel
+    config = auto_react_data.get(str(guild_id), {})
 
     if "log_webhook" in config:
-        import aiohttp
-        async with aiohttp.ClientSession() as session:
-            webhook = discord.Webhook.from_url(config["log_webhook"], session=session)
-            try:
-                await webhook.send(embed=log_embed, username="Mod Log", silent=True)
-            except Exception as e:
-                print("Webhook Logging failed:", e)
+        await http_pool.webhook(config["log_webhook"]).send(embeds=embeds, username="Mod Log", silent=True)
     elif "log_channel" in config:
         channel = bot.get_channel(config["log_channel"])
         if channel:
-            try:
-                await channel.send(embed=log_embed, silent=True)
-            except Exception as e:
-                print("Channel Logging failed:", e)
+            await channel.send(embeds=embeds, silent=True)
+
+# Log embeds are buffered per guild and sent up to 10 per message
+mod_log = ModLogSink(deliver_logs)
+
+def send_log(guild_id, log_embed):
+    config = auto_react_data.get(str(guild_id), {})
+    if "log_webhook" in config or "log_channel" in config:
+        mod_log.add(guild_id, log_embed)
 
 # ===================== ERROR HANDLER =====================
 @bot.event
@@ -1835,13 +2066,9 @@ async def on_app_command_error(interaction: discord.Interaction, error: app_comm
 async def mute(ctx, member: discord.Member, *, reason: str = None):
     role = discord.utils.get(ctx.guild.roles, name="Muted")
     if not role:
+        status = await ctx.send(embed=make_embed("<a:clock:1401933869804032061> Setting up the Muted role . . .", discord.Color.orange()))
         try:
-            role = await ctx.guild.create_role(name="Muted")
-            for channel in ctx.guild.channels:
-                try:
-                    await channel.set_permissions(role, send_messages=False, add_reactions=False)
-                except Exception:
-                    pass
+            role = await get_mute_role(ctx.guild, create=True, progress=progress_updater(status, "Setting up the Muted role"))
         except Exception:
             return await ctx.send(embed=make_embed("Failed to create Muted role. Missing permissions?", discord.Color.red()))
     try:
@@ -1880,3 +2107,10 @@ async def purge(ctx, limit: int):
 if __name__ == "__main__":
     TOKEN = "YOUR_TOKEN_HERE"  # <-- replace
     bot.run(TOKEN)
+    # write pending strikes, config and role changes that the background flushes didn't pick up yet
+    offense_store.flush()
+    if dirty_guilds:
+        storage.save_guild_configs(take_dirty_configs())
+    user_backup.write_deltas(storage, role_deltas.take())
+    storage.checkpoint()
+    storage.close()
@@ -2,10 +2,12 @@
 # control_panel.py
 from flask import Flask, request, redirect, url_for, render_template_string
 import subprocess, threading, os, signal, time, sys, re
+from modules.storage import Storage
 
 APP_HOST = "0.0.0.0"
 APP_PORT = int(os.environ.get("CONTROL_PORT", 80))  # default 80
 MAIN_PY = "main.py"
+DATABASE_FILE = "need.db"
 
 app = Flask(__name__)
 
@@ -13,6 +15,8 @@ _child = None
 _enabled = True
 _child_lock = threading.Lock()
 
+storage = Storage(DATABASE_FILE)
+
 HTML = """<!doctype html>
 <html>
   <head><title>Bot Control</title></head>
@@ -130,27 +134,31 @@ def replace_token_in_main(new_token):
         f.write(new_text)
     return True
 
-def read_log_channel():
+def get_whitelisted_guild_id():
     if not os.path.exists(MAIN_PY):
-        return "(none)"
+        return None
     text = open(MAIN_PY, "r", encoding="utf-8").read()
-    m = re.search(r'LOG_CHANNEL_ID\s*=\s*(\d+)', text)
-    if not m:
+    m = re.search(r'WHITELISTED_GUILDS\s*=\s*\[(\d+)\]', text)
+    return m.group(1) if m else None
+
+def read_log_channel():
+    guild_id = get_whitelisted_guild_id()
+    if not guild_id:
+        return "(none)"
+    cfg = storage.load_guild_config(guild_id)
+    if "log_channel" not in cfg:
         return "(none)"
-    return m.group(1)
+    return str(cfg["log_channel"])
 
 def replace_log_channel(new_id):
-    if not os.path.exists(MAIN_PY):
-        with open(MAIN_PY, "w", encoding="utf-8") as f:
-            f.write(f'LOG_CHANNEL_ID = {new_id}\n')
-        return True
-    text = open(MAIN_PY, "r", encoding="utf-8").read()
-    if re.search(r'LOG_CHANNEL_ID\s*=\s*(\d+)', text):
-        new_text = re.sub(r'LOG_CHANNEL_ID\s*=\s*(\d+)', f'LOG_CHANNEL_ID = {new_id}', text, count=1)
-    else:
-        new_text = f'LOG_CHANNEL_ID = {new_id}\n' + text
-    with open(MAIN_PY, "w", encoding="utf-8") as f:
-        f.write(new_text)
+    # the log target lives in the bot's guild config, same as `$log #channel`
+    guild_id = get_whitelisted_guild_id()
+    if not guild_id:
+        return False
+    cfg = storage.load_guild_config(guild_id)
+    cfg["log_channel"] = int(new_id)
+    cfg.pop("log_webhook", None)
+    storage.save_guild_config(guild_id, cfg)
     return True
 
 def read_logs():
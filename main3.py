@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 from flask import Flask, request, redirect, url_for, render_template_string
-import subprocess, threading, os, time, sys, re, json
+import subprocess, threading, os, time, sys, re
 import requests
+from modules.storage import Storage
 
 APP_HOST = "0.0.0.0"
 APP_PORT = int(os.environ.get("CONTROL_PORT", 8080))
 MAIN_PY = "main.py"
+DATABASE_FILE = "need.db"
 DATA_FILE = "1345476135487672350.json"
 LOG_FILE = "bot_stdout.log"
 
@@ -15,6 +17,11 @@ _child = None
 _enabled = True
 _child_lock = threading.Lock()
 
+storage = Storage(DATABASE_FILE)
+# keep-alive connection pool for Discord API calls from the panel
+http = requests.Session()
+storage.import_json_files(guild_file=DATA_FILE)
+
 HTML = """<!doctype html>
 <html>
   <head><title>Bot Control</title></head>
@@ -145,20 +152,14 @@ def replace_token_in_main(new_token):
         f.write(new_text)
     return True
 
-def load_datafile():
-    if not os.path.exists(DATA_FILE):
-        return {}
+def load_guild_config(guild_id):
     try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return storage.load_guild_config(guild_id)
     except Exception:
         return {}
 
-def save_datafile(data):
-    tmp = DATA_FILE + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-    os.replace(tmp, DATA_FILE)
+def save_guild_config(guild_id, cfg):
+    storage.save_guild_config(guild_id, cfg)
 
 def read_logs():
     if not os.path.exists(LOG_FILE):
@@ -184,7 +185,7 @@ def get_whitelisted_guild_id():
 def get_channels(guild_id, token):
     url = f"https://discord.com/api/v10/guilds/{guild_id}/channels"
     headers = {"Authorization": f"Bot {token}"}
-    response = requests.get(url, headers=headers)
+    response = http.get(url, headers=headers, timeout=10)
     if response.status_code == 200:
         channels = response.json()
         text_channels = [(str(ch['id']), ch['name']) for ch in channels if ch['type'] == 0]
@@ -198,12 +199,11 @@ def index():
     if not selected_guild:
         selected_guild = ""
 
-    data = load_datafile()
     current_log_display = "(none)"
     current_log_value = ""
     channel_options = []
-    if selected_guild and selected_guild in data:
-        cfg = data[selected_guild]
+    cfg = load_guild_config(selected_guild) if selected_guild else {}
+    if cfg:
         if "log_webhook" in cfg:
             current_log_display = cfg["log_webhook"]
             current_log_value = cfg["log_webhook"]
@@ -265,8 +265,10 @@ def set_log_channel():
     if not guild_id or not target:
         return redirect(url_for("index"))
 
-    data = load_datafile()
-    cfg = data.setdefault(guild_id, {})
+    if not guild_id.isdigit():
+        return redirect(url_for("index"))
+
+    cfg = load_guild_config(guild_id)
 
     if target.startswith("http"):
         cfg["log_webhook"] = target
@@ -275,9 +277,8 @@ def set_log_channel():
         cfg["log_channel"] = int(target)
         cfg.pop("log_webhook", None)
 
-    data[guild_id] = cfg
     try:
-        save_datafile(data)
+        save_guild_config(guild_id, cfg)
     except Exception:
         pass
 
@@ -0,0 +1,52 @@
+# backup_scheduler.py
+import gzip
+import io
+import json
+import time
+
+from modules import server_restore, user_backup
+
+# Scheduled snapshots are only archived as numbered generations; the live
+# backups that `$backup ... load/restore` use by default are left alone, so
+# a snapshot taken after a role wipe or channel nuke can't overwrite the
+# last good state. Any retained generation can be restored with gen:N.
+
+
+def is_due(storage, guild_id, interval, now=None):
+    # interval in seconds since the newest server generation
+    now = time.time() if now is None else now
+    latest = storage.latest_generation(guild_id, "server")
+    return latest is None or now - latest["created_at"] >= interval
+
+
+def snapshot_server(storage, guild_id, data, keep, max_age):
+    # runs in a worker thread; `data` comes from server_restore.capture() on the loop
+    started = time.perf_counter()
+    blob = gzip.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+    generation = storage.add_generation(
+        guild_id, "server", blob, server_restore.channel_count(data), time.perf_counter() - started
+    )
+    storage.prune_generations(guild_id, "server", keep, max_age)
+    return generation
+
+
+def snapshot_users(storage, guild_id, rows, keep, max_age):
+    # runs in a worker thread; `rows` come from user_backup.snapshot_members() on the loop
+    started = time.perf_counter()
+    fp = io.BytesIO()
+    count = user_backup.write_ndjson_gz(rows, fp)
+    generation = storage.add_generation(guild_id, "users", fp.getvalue(), count, time.perf_counter() - started)
+    storage.prune_generations(guild_id, "users", keep, max_age)
+    return generation
+
+
+def load_server(storage, guild_id, generation):
+    # server backup data of a generation, or None
+    blob = storage.get_generation(guild_id, "server", generation)
+    return None if blob is None else json.loads(gzip.decompress(blob))
+
+
+def load_users(storage, guild_id, generation):
+    # (user id, [role ids]) rows of a generation sorted by user id, or None
+    blob = storage.get_generation(guild_id, "users", generation)
+    return None if blob is None else user_backup.read_ndjson_gz(blob)
@@ -0,0 +1,96 @@
+# doxx_detector.py
+import re
+import time
+
+# Every pattern is compiled once at import. Each alternative can only start at
+# the beginning of a token (lookbehinds) and consumes its input
+# deterministically, so a search is linear in the message length.
+_EMAIL = r"(?P<email>(?<![a-zA-Z0-9._%+-])[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})"
+# 7-15 digits, optionally split by single separators / brackets: +49 (151) 234-5678
+_PHONE = r"(?P<phone>(?<![\d+])\+?\(?\d(?:[-.\s()]{0,2}\d){6,14}(?!\d))"
+_ADDRESS = (
+    r"(?P<address>(?i:\b[A-Z][a-z]+\s+(?:street|st|road|rd|avenue|ave|boulevard|blvd|lane|ln|drive|dr|"
+    r"way|court|ct|plaza|platz|place|allee|weg|strasse|straße|str\.)\s?\d{1,4}\b))"
+)
+
+# Pick the smallest combined pattern the cheap prefilters allow
+_ALL = re.compile("|".join((_EMAIL, _PHONE, _ADDRESS)))
+_NO_EMAIL = re.compile("|".join((_PHONE, _ADDRESS)))
+_EMAIL_ONLY = re.compile(_EMAIL)
+
+_DIGIT = re.compile(r"\d")
+# Mentions, channels, custom emojis, timestamps and links carry long ids that
+# would otherwise look like phone numbers
+_MARKUP = re.compile(r"<(?:@[!&]?|#|a?:\w+:|t:)\d+(?::\w)?>|https?://\S+")
+
+DEFAULT_BUDGET = 0.005  # seconds per message
+_CHUNK = 1024
+_OVERLAP = 256
+_SPACES = " \t\n\r\f\v"
+
+# number of messages that ran out of budget and were let through unscanned
+budget_overruns = 0
+
+
+def detect(text, budget=DEFAULT_BUDGET):
+    # Returns "email", "phone", "address" or None
+    global budget_overruns
+
+    has_at = "@" in text
+    if not has_at and _DIGIT.search(text) is None:
+        return None
+    text = _MARKUP.sub(" ", text)
+    has_digit = _DIGIT.search(text) is not None
+    has_at = has_at and "@" in text
+
+    if has_at and has_digit:
+        pattern = _ALL
+    elif has_digit:
+        pattern = _NO_EMAIL
+    elif has_at:
+        pattern = _EMAIL_ONLY
+    else:
+        return None
+
+    # Scan in overlapping windows so the time budget is checked between
+    # bounded amounts of work
+    deadline = time.perf_counter() + budget
+    n = len(text)
+    pos = 0
+    span = _CHUNK
+    while pos < n:
+        if time.perf_counter() > deadline:
+            budget_overruns += 1
+            return None
+        limit = min(n, pos + span)
+        endpos = min(n, limit + _OVERLAP)
+        m = pattern.search(text, pos, endpos)
+        while m is not None and m.start() < limit:
+            if m.end() < endpos or endpos == n:
+                return m.lastgroup
+            # the match ran into the window edge, confirm it against the full text
+            full = pattern.match(text, m.start())
+            if full is not None:
+                return full.lastgroup
+            m = pattern.search(text, m.start() + 1, endpos)
+        if limit == n:
+            return None
+        # Matches only start at token starts, and one longer than the overlap
+        # can start in the last token before the edge, so resume there. When
+        # that token began at or before this window, widen the window instead.
+        resume = _token_start(text, pos, limit)
+        if resume > pos:
+            pos = resume
+            span = _CHUNK
+        else:
+            span *= 2
+    return None
+
+
+def _token_start(text, pos, limit):
+    # start of the last whitespace-separated token before `limit`; pos or less
+    # when no token starts after pos
+    end = limit
+    while end > pos and text[end - 1].isspace():
+        end -= 1
+    return max(text.rfind(c, pos, end) for c in _SPACES) + 1
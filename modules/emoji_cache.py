@@ -0,0 +1,121 @@
+# emoji_cache.py
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+
+
+class EmojiCache:
+    # Content-addressed on-disk cache for CDN downloads. Blobs are stored as
+    # <sha256>.<ext> under `directory`, and an LRU index (key -> digest, size)
+    # kept in storage maps "<emoji id>.<ext>" keys to them. Reads verify the
+    # digest, and the least recently used entries are evicted once the cache
+    # holds more than `max_bytes`.
+    def __init__(self, storage, directory, max_bytes=64 * 1024 * 1024, name="emoji_cache"):
+        self.storage = storage
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._index = OrderedDict((key, (digest, size)) for key, digest, size in storage.get(name, []))
+        self._size = sum(size for _, size in self._index.values())
+        self._inflight = {}  # key -> download task shared by concurrent fetches
+        self._warming = set()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, digest):
+        return os.path.join(self.directory, f"{digest}{os.path.splitext(key)[1]}")
+
+    def _read(self, path, digest):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        return data if hashlib.sha256(data).hexdigest() == digest else None
+
+    def _write(self, path, data):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _save_index(self):
+        self.storage.set(self.name, [[key, digest, size] for key, (digest, size) in self._index.items()])
+
+    def _drop(self, key):
+        # removes the entry, and its blob when no other key shares it
+        digest, size = self._index.pop(key)
+        self._size -= size
+        path = self._path(key, digest)
+        if not any(d == digest and self._path(k, d) == path for k, (d, _) in self._index.items()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    async def get(self, key):
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        data = await asyncio.to_thread(self._read, self._path(key, entry[0]), entry[0])
+        if data is None:
+            # missing or corrupted blob
+            if key in self._index:
+                self._drop(key)
+                await asyncio.to_thread(self._save_index)
+            return None
+        if key in self._index:
+            self._index.move_to_end(key)
+        return data
+
+    async def put(self, key, data):
+        digest = hashlib.sha256(data).hexdigest()
+        if key in self._index:
+            self._drop(key)
+        await asyncio.to_thread(self._write, self._path(key, digest), data)
+        if key in self._index:
+            # another put for the key finished during the write
+            if self._index[key][0] == digest:
+                self._size -= self._index.pop(key)[1]
+            else:
+                self._drop(key)
+        self._index[key] = (digest, len(data))
+        self._size += len(data)
+        while self._size > self.max_bytes and len(self._index) > 1:
+            self._drop(next(iter(self._index)))
+        await asyncio.to_thread(self._save_index)
+
+    async def fetch(self, http_pool, key, url):
+        # cached bytes, or download through the shared pool and cache them;
+        # concurrent misses for one key share a single download
+        data = await self.get(key)
+        if data is not None:
+            self.hits += 1
+            return data
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._download(http_pool, key, url))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key, None) if self._inflight.get(key) is t else None)
+        return await asyncio.shield(task)
+
+    async def _download(self, http_pool, key, url):
+        data = await http_pool.get_bytes(url)
+        if data is not None:
+            await self.put(key, data)
+        return data
+
+    def warm(self, http_pool, key, url):
+        # fetch in the background, e.g. while a preview is shown
+        task = asyncio.create_task(self._warm(http_pool, key, url))
+        self._warming.add(task)
+        task.add_done_callback(self._warming.discard)
+
+    async def _warm(self, http_pool, key, url):
+        try:
+            await self.fetch(http_pool, key, url)
+        except Exception as e:
+            print(f"[EmojiCache] Warming {key} failed: {e}")
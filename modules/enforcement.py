@@ -0,0 +1,194 @@
+# enforcement.py
+import asyncio
+import datetime
+import time
+
+import discord
+
+from modules import rest_retry
+
+# higher wins when several punishments for the same member are coalesced
+SEVERITY = {"mute": 1, "timeout": 1, "kick": 2, "ban": 3}
+DEFAULT_TIMEOUT = datetime.timedelta(minutes=5)
+
+
+class _Pending:
+    __slots__ = ("member", "action", "reason", "duration", "create_mute_role", "messages")
+
+    def __init__(self, member):
+        self.member = member
+        self.action = None
+        self.reason = None
+        self.duration = None
+        self.create_mute_role = False
+        self.messages = {}  # message id -> message to delete
+
+
+class Enforcer:
+    # Queue between the detectors and Discord's REST API. Actions are coalesced
+    # per (guild, user): a ban supersedes pending deletes and mutes, a kick
+    # supersedes a mute, and a punishment that was just applied is not sent
+    # again. Workers drain the queue concurrently so on_message never waits.
+    def __init__(self, workers=4, cooldown=30, get_mute_role=None):
+        self.worker_count = workers
+        self.cooldown = cooldown
+        # async (guild, create) -> Muted role or None
+        self.get_mute_role = get_mute_role
+        self._pending = {}
+        self._recent = {}  # (guild id, user id) -> (action, monotonic time)
+        self._queue = None
+        self._workers = []
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        for key in self._pending:
+            self._queue.put_nowait(key)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _entry(self, member):
+        key = (member.guild.id, member.id)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _Pending(member)
+            if self._queue is not None:
+                self._queue.put_nowait(key)
+        return pending
+
+    def delete(self, message):
+        pending = self._entry(message.author)
+        # a pending ban already wipes the member's recent messages
+        if pending.action != "ban":
+            pending.messages[message.id] = message
+
+    def punish(self, member, action, reason, duration=None, create_mute_role=False):
+        key = (member.guild.id, member.id)
+        last = self._recent.get(key)
+        if last and SEVERITY[last[0]] >= SEVERITY[action] and time.monotonic() - last[1] < self.cooldown:
+            return
+
+        pending = self._entry(member)
+        if pending.action is not None:
+            current = SEVERITY[pending.action]
+            if SEVERITY[action] < current:
+                return
+            if SEVERITY[action] == current and (duration or DEFAULT_TIMEOUT) <= (pending.duration or DEFAULT_TIMEOUT):
+                return
+        pending.action = action
+        pending.reason = reason
+        pending.duration = duration
+        pending.create_mute_role = create_mute_role
+        if action == "ban":
+            pending.messages.clear()
+
+    async def _worker(self):
+        while True:
+            key = await self._queue.get()
+            pending = self._pending.pop(key, None)
+            try:
+                if pending is not None:
+                    await self._apply(key, pending)
+            except Exception as e:
+                print(f"[Enforcement] Failed for {key[1]} in {key[0]}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _apply(self, key, pending):
+        for message in pending.messages.values():
+            await self._call(message.delete)
+
+        if pending.action is None:
+            return
+        self._recent[key] = (pending.action, time.monotonic())
+        if len(self._recent) > 10000:
+            cutoff = time.monotonic() - self.cooldown
+            self._recent = {k: v for k, v in self._recent.items() if v[1] >= cutoff}
+        await self._call(self._punish, pending)
+
+    async def _punish(self, pending):
+        member = pending.member
+        guild = member.guild
+        action = pending.action
+        reason = pending.reason
+
+        if action == "mute":
+            role = None
+            if self.get_mute_role is not None:
+                role = await self.get_mute_role(guild, pending.create_mute_role)
+            if role:
+                await member.add_roles(role, reason=reason)
+            else:
+                await member.timeout(pending.duration or DEFAULT_TIMEOUT, reason=reason)
+        elif action == "timeout":
+            await member.timeout(pending.duration or DEFAULT_TIMEOUT, reason=reason)
+        elif action == "kick":
+            await member.kick(reason=reason)
+        elif action == "ban":
+            await guild.ban(member, reason=reason, delete_message_seconds=600)
+
+    async def _call(self, func, *args, retries=3):
+        # gives up quietly on 403/404; other failures reach the worker's log
+        try:
+            return await rest_retry.call(func, *args, retries=retries, quiet=False)
+        except (discord.Forbidden, discord.NotFound):
+            return None
+
+
+def _all_failed(chunk):
+    # BulkBanResult for a chunk that wasn't banned at all
+    return discord.BulkBanResult(banned=[], failed=[discord.Object(id=m.id) for m in chunk])
+
+
+class RaidBatcher:
+    # Collects anti-raid offenders per guild for `window` seconds and bans them
+    # together with Guild.bulk_ban (at most 200 users per call) instead of one
+    # REST call per account.
+    MAX_BATCH = 200
+
+    def __init__(self, window=3.0, report=None):
+        self.window = window
+        # async (guild, BulkBanResult, reason) -> None, posts the batch summary
+        self.report = report
+        self._batches = {}  # guild id -> {user id: member}
+        self._timers = {}
+
+    def add(self, member, reason):
+        guild = member.guild
+        self._batches.setdefault(guild.id, {})[member.id] = member
+        if guild.id not in self._timers:
+            self._timers[guild.id] = asyncio.create_task(self._flush_later(guild, reason))
+
+    async def _flush_later(self, guild, reason):
+        await asyncio.sleep(self.window)
+        self._timers.pop(guild.id, None)
+        members = list(self._batches.pop(guild.id, {}).values())
+        can_ban = guild.me.guild_permissions.ban_members
+        for i in range(0, len(members), self.MAX_BATCH):
+            chunk = members[i:i + self.MAX_BATCH]
+            summary = reason
+            # a chunk that can't be banned is still reported, with every member failed
+            if not can_ban:
+                result = _all_failed(chunk)
+                summary = f"{reason} (missing Ban Members permission)"
+            else:
+                try:
+                    result = await guild.bulk_ban(chunk, reason=reason, delete_message_seconds=600)
+                except discord.HTTPException as e:
+                    print(f"[RaidBatch] Bulk ban of {len(chunk)} users failed in {guild.id}: {e}")
+                    result = _all_failed(chunk)
+                    summary = f"{reason} (bulk ban failed: {e})"
+            if self.report is not None:
+                try:
+                    await self.report(guild, result, summary)
+                except Exception as e:
+                    print(f"[RaidBatch] Summary failed in {guild.id}: {e}")
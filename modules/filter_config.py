@@ -0,0 +1,147 @@
+# filter_config.py
+import time
+from dataclasses import dataclass, field
+
+from modules.word_matcher import WordMatcher
+
+PUNISHMENTS = ["mute", "kick", "timeout", "ban"]
+
+
+@dataclass
+class DoxxConfig:
+    enabled: bool = False
+    punishment: str = "timeout"
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            enabled=bool(data.get("enabled", False)),
+            punishment=data.get("punishment", "timeout"),
+        )
+
+    def to_dict(self):
+        return {"enabled": self.enabled, "punishment": self.punishment}
+
+
+@dataclass
+class FilterConfig:
+    enabled: bool = False
+    strict: bool = False
+    punishment: str = "timeout"
+    words: list = field(default_factory=list)
+    exempt_users: list = field(default_factory=list)
+    exempt_roles: list = field(default_factory=list)
+    doxx: DoxxConfig = field(default_factory=DoxxConfig)
+    _matcher: WordMatcher = field(default=None, init=False, repr=False, compare=False)
+    _matcher_key: tuple = field(default=None, init=False, repr=False, compare=False)
+    exempt_user_ids: frozenset = field(default=frozenset(), init=False, repr=False, compare=False)
+    exempt_role_ids: frozenset = field(default=frozenset(), init=False, repr=False, compare=False)
+    # bumped on every rebuild so cached exemption lookups know they're stale
+    version: int = field(default=0, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_dict(cls, data):
+        config = cls(
+            enabled=bool(data.get("enabled", False)),
+            strict=bool(data.get("strict", False)),
+            # `$nsfw filter on` used to store the punishment under "action"
+            punishment=data.get("action", data.get("punishment", "timeout")),
+            words=list(data.get("words", [])),
+            exempt_users=list(data.get("exempt_users", [])),
+            exempt_roles=list(data.get("exempt_roles", [])),
+            doxx=DoxxConfig.from_dict(data.get("doxx", {})),
+        )
+        config.rebuild()
+        return config
+
+    def to_dict(self):
+        return {
+            "enabled": self.enabled,
+            "strict": self.strict,
+            "punishment": self.punishment,
+            "words": self.words,
+            "exempt_users": self.exempt_users,
+            "exempt_roles": self.exempt_roles,
+            "doxx": self.doxx.to_dict(),
+        }
+
+    def rebuild(self):
+        # only recompile the automaton when the word list or mode actually changed
+        key = (tuple(self.words), self.strict)
+        if key != self._matcher_key:
+            self._matcher = WordMatcher(self.words, strict=self.strict)
+            self._matcher_key = key
+        self.exempt_user_ids = frozenset(int(i) for i in self.exempt_users)
+        self.exempt_role_ids = frozenset(int(i) for i in self.exempt_roles)
+        self.version += 1
+
+    def is_exempt(self, member):
+        if member.id in self.exempt_user_ids:
+            return True
+        if not self.exempt_role_ids:
+            return False
+        return not self.exempt_role_ids.isdisjoint(r.id for r in getattr(member, "roles", ()))
+
+    def matches(self, text):
+        return self._matcher.matches(text)
+
+
+class ExemptionCache:
+    # (guild id, member id) -> exemption flag for the current config version.
+    # Entries are dropped when the member's roles change or the config is saved.
+    def __init__(self, max_size=50000):
+        self.max_size = max_size
+        self._cache = {}
+        self._config = None
+        self._version = None
+
+    def is_exempt(self, config, member):
+        if config is not self._config or config.version != self._version:
+            self._cache.clear()
+            self._config = config
+            self._version = config.version
+        key = (member.guild.id, member.id)
+        exempt = self._cache.get(key)
+        if exempt is None:
+            exempt = config.is_exempt(member)
+            if len(self._cache) >= self.max_size:
+                self._cache.clear()
+            self._cache[key] = exempt
+        return exempt
+
+    def invalidate(self, guild_id, member_id):
+        self._cache.pop((guild_id, member_id), None)
+
+
+class FilterStore:
+    # Keeps the filter config in memory and only re-reads it when its row
+    # version changed in storage (another process edited it) or a command
+    # saved a new version. Storage is asked for the version at most every
+    # `check_interval` seconds, so on_message doesn't hit the database.
+    def __init__(self, storage, name="nsfw_filter", check_interval=2.0):
+        self.storage = storage
+        self.name = name
+        self.check_interval = check_interval
+        self._config = None
+        self._version = None
+        self._checked = None
+
+    def get(self):
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_interval:
+            return self._config
+        self._checked = now
+        version = self.storage.version(self.name)
+        if version is None:
+            self._config = self._version = None
+        elif version != self._version:
+            data, version = self.storage.get_versioned(self.name)
+            self._config = FilterConfig.from_dict(data)
+            self._version = version
+        return self._config
+
+    def save(self, config):
+        config.rebuild()
+        self._version = self.storage.set(self.name, config.to_dict())
+        self._config = config
+        self._checked = time.monotonic()
@@ -0,0 +1,89 @@
+# guild_policy.py
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+import discord
+
+_EMPTY = MappingProxyType({})
+
+
+def _empty():
+    return _EMPTY
+
+
+def emoji_key(emoji):
+    # custom emojis by id (survives renames), unicode ones by their text
+    return emoji.id or emoji.name
+
+
+def _int_keys(mapping):
+    return MappingProxyType({int(k): v for k, v in mapping.items() if str(k).isdigit()})
+
+
+@dataclass(frozen=True)
+class GuildPolicy:
+    # A guild's moderation config compiled into int-keyed lookups. Compiled
+    # once per config change; event handlers only ever read it.
+    autoreact: MappingProxyType = field(default_factory=_empty)  # user id -> PartialEmoji
+    autoremove_messages: frozenset = frozenset()  # user ids
+    autoremove_reactions: MappingProxyType = field(default_factory=_empty)  # user id -> frozenset of emoji keys
+    forcenicks: MappingProxyType = field(default_factory=_empty)  # user id -> nickname
+    role_blocks: MappingProxyType = field(default_factory=_empty)  # user id -> frozenset of blocked role ids
+    spam_action: str = None  # anti-raid spam action, None when disabled
+    on_message: bool = field(default=False, init=False)
+    on_member_update: bool = field(default=False, init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "on_message", bool(self.autoreact or self.autoremove_messages or self.spam_action))
+        object.__setattr__(self, "on_member_update", bool(self.forcenicks or self.role_blocks))
+
+    @property
+    def active(self):
+        return self.on_message or self.on_member_update or bool(self.autoremove_reactions)
+
+    @classmethod
+    def compile(cls, config):
+        if not config:
+            return EMPTY_POLICY
+
+        # parsed once here instead of on every reaction
+        autoreact = MappingProxyType({
+            int(k): discord.PartialEmoji.from_str(v) for k, v in config.items() if k.isdigit() and v
+        })
+
+        autoremove_messages = frozenset(
+            int(uid) for uid, enabled in config.get("autoremove_messages", {}).items() if enabled
+        )
+
+        reactions = {}
+        for key, enabled in config.get("autoremove_reactions", {}).items():
+            uid, sep, emoji = key.partition(":")
+            if enabled and sep and uid.isdigit():
+                reactions.setdefault(int(uid), set()).add(emoji_key(discord.PartialEmoji.from_str(emoji)))
+
+        blocks = {}
+        for role_id, user_ids in config.get("role_blocks", {}).items():
+            for uid in user_ids:
+                blocks.setdefault(int(uid), set()).add(int(role_id))
+
+        spam = config.get("antiraid", {}).get("spam", {})
+        if spam.get("enabled"):
+            spam_action = spam.get("action")
+        elif config.get("antiraid_spam_enabled"):
+            spam_action = config.get("antiraid_spam_action")
+        else:
+            spam_action = None
+
+        policy = cls(
+            autoreact=autoreact,
+            autoremove_messages=autoremove_messages,
+            autoremove_reactions=MappingProxyType({u: frozenset(e) for u, e in reactions.items()}),
+            forcenicks=_int_keys(config.get("forcenicknames", {})),
+            role_blocks=MappingProxyType({u: frozenset(r) for u, r in blocks.items()}),
+            spam_action=spam_action,
+        )
+        return policy if policy.active else EMPTY_POLICY
+
+
+# shared no-op policy for guilds without any active feature
+EMPTY_POLICY = GuildPolicy()
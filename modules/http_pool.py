@@ -0,0 +1,50 @@
+# http_pool.py
+from collections import OrderedDict
+
+import aiohttp
+import discord
+
+
+class HttpPool:
+    # One long-lived aiohttp session for every outbound request the bot makes
+    # itself (CDN downloads, log webhooks), so connections are kept alive and
+    # reused instead of paying a TCP+TLS handshake per request. Webhook
+    # objects are cached per URL on top of it.
+    def __init__(self, limit=64, timeout=30, max_webhooks=256):
+        self.limit = limit
+        self.timeout = timeout
+        self.max_webhooks = max_webhooks
+        self.session = None
+        self._webhooks = OrderedDict()
+
+    async def start(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._webhooks.clear()
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self._webhooks.clear()
+
+    def webhook(self, url):
+        webhook = self._webhooks.get(url)
+        if webhook is None:
+            webhook = self._webhooks[url] = discord.Webhook.from_url(url, session=self.session)
+            if len(self._webhooks) > self.max_webhooks:
+                self._webhooks.popitem(last=False)
+        else:
+            self._webhooks.move_to_end(url)
+        return webhook
+
+    async def get_bytes(self, url):
+        # body of a 200 response, or None
+        await self.start()
+        async with self.session.get(url) as resp:
+            if resp.status != 200:
+                return None
+            return await resp.read()
@@ -0,0 +1,84 @@
+# mod_log.py
+import asyncio
+from collections import deque
+
+from modules import rest_retry
+
+# Discord limits for one message
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+
+class ModLogSink:
+    # Buffers mod-log embeds per guild and delivers them as multi-embed
+    # messages, either `delay` seconds after the first one arrived or as soon
+    # as a full message is buffered. add() never awaits, so logging costs the
+    # command path nothing; when a guild's buffer is full the oldest embed is
+    # dropped and counted in `overflow`.
+    def __init__(self, deliver, delay=2.0, max_pending=200, retries=4):
+        # async (guild id, [embeds]) -> None, raises discord.HTTPException on failure
+        self.deliver = deliver
+        self.delay = delay
+        self.max_pending = max_pending
+        self.retries = retries
+        self.overflow = 0
+        self.failed = 0
+        self._pending = {}  # guild id -> deque of embeds
+        self._tasks = {}
+        self._full = {}  # guild id -> Event set once a whole message is buffered
+
+    def __len__(self):
+        return sum(len(q) for q in self._pending.values())
+
+    def add(self, guild_id, embed):
+        queue = self._pending.get(guild_id)
+        if queue is None:
+            queue = self._pending[guild_id] = deque()
+        if len(queue) >= self.max_pending:
+            queue.popleft()
+            self.overflow += 1
+        queue.append(embed)
+        if guild_id not in self._tasks:
+            self._full[guild_id] = asyncio.Event()
+            self._tasks[guild_id] = asyncio.create_task(self._run(guild_id))
+        if len(queue) >= MAX_EMBEDS:
+            self._full[guild_id].set()
+
+    def _take_batch(self, queue):
+        batch = []
+        chars = 0
+        while queue and len(batch) < MAX_EMBEDS:
+            size = len(queue[0])
+            if batch and chars + size > MAX_EMBED_CHARS:
+                break
+            batch.append(queue.popleft())
+            chars += size
+        return batch
+
+    async def _run(self, guild_id):
+        try:
+            try:
+                await asyncio.wait_for(self._full[guild_id].wait(), self.delay)
+            except asyncio.TimeoutError:
+                pass
+            queue = self._pending.get(guild_id)
+            while queue:
+                await self._send(guild_id, self._take_batch(queue))
+        finally:
+            self._tasks.pop(guild_id, None)
+            self._full.pop(guild_id, None)
+            if not self._pending.get(guild_id):
+                self._pending.pop(guild_id, None)
+
+    async def _send(self, guild_id, batch):
+        try:
+            await rest_retry.call(self.deliver, guild_id, batch, retries=self.retries, quiet=False)
+        except Exception as e:
+            print(f"[ModLog] Delivery failed in {guild_id}: {e}")
+            self.failed += len(batch)
+
+    async def flush(self):
+        # deliver everything still buffered, e.g. before shutdown
+        for event in self._full.values():
+            event.set()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
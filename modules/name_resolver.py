@@ -0,0 +1,72 @@
+# name_resolver.py
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+
+class NameResolver:
+    # Resolves user ids for list commands: guild member cache first, then the
+    # client's user cache, then a TTL+LRU cache of users fetched earlier, and
+    # only the remaining misses go to the API, concurrently. Unknown ids are
+    # cached as None so they aren't fetched again until the TTL runs out.
+    def __init__(self, client, ttl=600, max_size=5000, concurrency=8):
+        self.client = client
+        self.ttl = ttl
+        self.max_size = max_size
+        self.concurrency = concurrency
+        self._cache = OrderedDict()  # user id -> (user or None, expires at)
+
+    def _cached(self, user_id, now):
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return False, None
+        if entry[1] < now:
+            del self._cache[user_id]
+            return False, None
+        self._cache.move_to_end(user_id)
+        return True, entry[0]
+
+    def _store(self, user_id, user, now):
+        self._cache[user_id] = (user, now + self.ttl)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def resolve(self, guild, user_ids):
+        # {user id: Member/User or None} for every id in user_ids
+        now = time.monotonic()
+        result = {}
+        missing = []
+        for user_id in dict.fromkeys(int(u) for u in user_ids):
+            user = (guild.get_member(user_id) if guild is not None else None) or self.client.get_user(user_id)
+            if user is None:
+                found, user = self._cached(user_id, now)
+                if not found:
+                    missing.append(user_id)
+                    continue
+            result[user_id] = user
+
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(user_id):
+            async with sem:
+                try:
+                    user = await self.client.fetch_user(user_id)
+                except discord.NotFound:
+                    user = None
+                except discord.HTTPException:
+                    # transient, don't remember it
+                    result[user_id] = None
+                    return
+            self._store(user_id, user, time.monotonic())
+            result[user_id] = user
+
+        await asyncio.gather(*(fetch(user_id) for user_id in missing))
+        return result
+
+    async def names(self, guild, user_ids):
+        # {user id: display name}, falling back to the raw id
+        users = await self.resolve(guild, user_ids)
+        return {user_id: user.name if user is not None else str(user_id) for user_id, user in users.items()}
@@ -0,0 +1,69 @@
+# offense_store.py
+import time
+from collections import deque
+
+
+class OffenseStore:
+    # Strike timestamps per feature ("nsfw", "doxx", ...) and user, kept as
+    # in-memory sliding windows. Recording a strike never touches disk; storage
+    # is written behind by flush()/write() on an interval and at shutdown.
+    def __init__(self, storage, windows, name="offenses"):
+        self.storage = storage
+        self.name = name
+        self.windows = windows  # kind -> window in seconds
+        self._strikes = {kind: {} for kind in windows}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        data = self.storage.get(self.name, {})
+        for kind, offenses in data.items():
+            self.import_offenses(kind, offenses)
+        self.dirty = False
+
+    def import_offenses(self, kind, offenses):
+        if kind not in self._strikes:
+            return
+        now = time.time()
+        window = self.windows[kind]
+        for user_id, stamps in offenses.items():
+            entry = self._strikes[kind].setdefault(str(user_id), deque())
+            entry.extend(sorted(t for t in stamps if now - t <= window))
+            if not entry:
+                del self._strikes[kind][str(user_id)]
+        self.dirty = True
+
+    def record(self, kind, user_id, now=None):
+        now = time.time() if now is None else now
+        window = self.windows[kind]
+        entry = self._strikes[kind].get(user_id)
+        if entry is None:
+            entry = self._strikes[kind][user_id] = deque()
+        while entry and now - entry[0] > window:
+            entry.popleft()
+        entry.append(now)
+        self.dirty = True
+        return len(entry)
+
+    def reset(self, kind, user_id):
+        if self._strikes[kind].pop(user_id, None) is not None:
+            self.dirty = True
+
+    def snapshot(self):
+        # drop expired windows so the file only holds live strikes
+        now = time.time()
+        data = {}
+        for kind, users in self._strikes.items():
+            window = self.windows[kind]
+            for user_id in [u for u, entry in users.items() if not entry or now - entry[-1] > window]:
+                del users[user_id]
+            data[kind] = {user_id: list(entry) for user_id, entry in users.items()}
+        self.dirty = False
+        return data
+
+    def write(self, data):
+        self.storage.set(self.name, data)
+
+    def flush(self):
+        if self.dirty:
+            self.write(self.snapshot())
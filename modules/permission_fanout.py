@@ -0,0 +1,67 @@
+# permission_fanout.py
+import asyncio
+
+from modules import rest_retry
+
+
+async def _set_overwrite(channel, target, overwrite, retries):
+    result = await rest_retry.call(channel.set_permissions, target, overwrite=overwrite, retries=retries)
+    return result is not rest_retry.FAILED
+
+
+async def _run(jobs, concurrency, progress):
+    sem = asyncio.Semaphore(concurrency)
+    total = len(jobs)
+    done = 0
+
+    async def run(job):
+        nonlocal done
+        async with sem:
+            await job()
+        done += 1
+        if progress is not None:
+            await progress(done, total)
+
+    await asyncio.gather(*(run(job) for job in jobs))
+
+
+async def fan_out(channels, target, updates, concurrency=8, progress=None, retries=3):
+    # Applies `updates` (permission name -> value) to target's overwrite in
+    # every channel, `concurrency` channels at a time. Returns the rollback
+    # journal {channel id: {permission name: previous value}} for the channels
+    # that were actually changed.
+    journal = {}
+
+    def job_for(channel):
+        async def job():
+            overwrite = channel.overwrites_for(target)
+            previous = {name: getattr(overwrite, name) for name in updates}
+            overwrite.update(**updates)
+            if await _set_overwrite(channel, target, overwrite, retries):
+                journal[str(channel.id)] = previous
+        return job
+
+    await _run([job_for(ch) for ch in channels], concurrency, progress)
+    return journal
+
+
+async def roll_back(guild, target, journal, concurrency=8, progress=None, retries=3):
+    # Restores the values recorded by fan_out(). Older journals stored a bare
+    # use_external_apps value per channel.
+    def job_for(channel, previous):
+        async def job():
+            overwrite = channel.overwrites_for(target)
+            overwrite.update(**previous)
+            await _set_overwrite(channel, target, overwrite, retries)
+        return job
+
+    jobs = []
+    for ch_id, previous in journal.items():
+        channel = guild.get_channel(int(ch_id))
+        if channel is None:
+            continue
+        if not isinstance(previous, dict):
+            previous = {"use_external_apps": previous}
+        jobs.append(job_for(channel, previous))
+
+    await _run(jobs, concurrency, progress)
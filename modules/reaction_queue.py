@@ -0,0 +1,80 @@
+# reaction_queue.py
+import asyncio
+import time
+
+from modules import rest_retry
+
+
+class ReactionQueue:
+    # Background queue for autoreact reactions so on_message never waits on
+    # the reaction bucket. Each (guild, user) target may queue `rate`
+    # reactions per `per` seconds; past that only every `sample_every`-th
+    # message still gets one and the rest are dropped and counted.
+    def __init__(self, rate=5, per=10.0, sample_every=5, max_pending=500, workers=2):
+        self.rate = rate
+        self.per = per
+        self.sample_every = sample_every
+        self.max_pending = max_pending
+        self.worker_count = workers
+        self.dropped = 0
+        self._buckets = {}  # (guild id, user id) -> [tokens, last refill, over-rate count]
+        self._queue = None
+        self._workers = []
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(self.max_pending)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _allow(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.rate), now, 0]
+            if len(self._buckets) > 10000:
+                self._evict(now)
+        else:
+            bucket[0] = min(self.rate, bucket[0] + (now - bucket[1]) * self.rate / self.per)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            bucket[2] = 0
+            return True
+        bucket[2] += 1
+        return bucket[2] % self.sample_every == 0
+
+    def _evict(self, now):
+        # drop buckets that have refilled completely, they hold no state
+        idle = [k for k, b in self._buckets.items() if now - b[1] >= self.per]
+        for k in idle:
+            del self._buckets[k]
+
+    def add(self, message, emoji):
+        if self._queue is None or not self._allow((message.guild.id, message.author.id), time.monotonic()):
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait((message, emoji))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    async def _worker(self):
+        while True:
+            message, emoji = await self._queue.get()
+            try:
+                await self._react(message, emoji)
+            except Exception as e:
+                print(f"[AutoReact] Failed on {message.id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _react(self, message, emoji, retries=3):
+        await rest_retry.call(message.add_reaction, emoji, retries=retries)
@@ -0,0 +1,28 @@
+# rest_retry.py
+import asyncio
+
+import discord
+
+# returned by call() when it gave up quietly
+FAILED = object()
+
+
+def retryable(e):
+    # 429s that still surface past discord.py's bucket handling and transient 5xx errors
+    return not isinstance(e, (discord.Forbidden, discord.NotFound)) and (e.status == 429 or e.status >= 500)
+
+
+async def call(func, *args, retries=3, quiet=True, **kwargs):
+    # Awaits func(*args, **kwargs), retrying retryable errors after retry_after
+    # (or 1, 2, 4... seconds). On 403/404, other 4xx errors or when the retries
+    # run out it returns FAILED, or raises the last error when quiet is False.
+    for attempt in range(retries):
+        try:
+            return await func(*args, **kwargs)
+        except discord.HTTPException as e:
+            if not retryable(e) or attempt == retries - 1:
+                if quiet:
+                    return FAILED
+                raise
+            await asyncio.sleep(getattr(e, "retry_after", None) or 2 ** attempt)
+    return FAILED
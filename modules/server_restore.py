@@ -0,0 +1,201 @@
+# server_restore.py
+import asyncio
+
+import discord
+
+from modules import rest_retry
+
+# channel types a restore can create; others are kept if they exist but skipped otherwise
+CREATABLE = ("text", "voice")
+# returned by _call when the request failed (deletes and bulk updates return None)
+FAILED = rest_retry.FAILED
+
+
+class RestorePlan:
+    # Minimal set of REST operations that turns the live guild into a server
+    # backup: channels that already match (same category, name and type) are
+    # kept and only edited where their settings differ, the rest are created
+    # or deleted. Positions are applied at the end in one bulk update.
+    def __init__(self):
+        self.delete = []             # live channels/categories not in the backup
+        self.create_categories = []  # category names
+        self.create_channels = []    # (category name or None, live category or None, channel data)
+        self.edit = []               # (live channel, {field: value})
+        self.order = []              # (category name or None, channel data or None, live channel or None)
+        self.unsupported = 0
+
+    def __len__(self):
+        return len(self.delete) + len(self.create_categories) + len(self.create_channels) + len(self.edit)
+
+
+def _channel_data(ch):
+    return {
+        "name": ch.name,
+        "type": str(ch.type),
+        "position": ch.position,
+        "slowmode_delay": getattr(ch, "slowmode_delay", 0),
+        "nsfw": getattr(ch, "nsfw", False),
+        "bitrate": getattr(ch, "bitrate", None),
+        "user_limit": getattr(ch, "user_limit", None)
+    }
+
+
+def capture(guild):
+    # the live channel layout in the server backup format
+    categories = [
+        {"name": cat.name, "channels": [_channel_data(ch) for ch in sorted(cat.channels, key=lambda c: c.position)]}
+        for cat in guild.categories
+    ]
+    uncategorized = [
+        _channel_data(ch)
+        for ch in sorted([c for c in guild.channels if c.category is None and not isinstance(c, discord.CategoryChannel)],
+                         key=lambda c: c.position)
+    ]
+    return {"categories": categories, "uncategorized": uncategorized}
+
+
+def channel_count(data):
+    return sum(len(c["channels"]) for c in data["categories"]) + len(data["uncategorized"])
+
+
+def _settings(guild, ch_data):
+    if ch_data["type"] == "text":
+        return {"slowmode_delay": ch_data.get("slowmode_delay") or 0, "nsfw": bool(ch_data.get("nsfw"))}
+    if ch_data["type"] == "voice":
+        settings = {"user_limit": ch_data.get("user_limit") or 0}
+        if ch_data.get("bitrate"):
+            settings["bitrate"] = min(ch_data["bitrate"], int(guild.bitrate_limit))
+        return settings
+    return {}
+
+
+def plan(guild, data):
+    result = RestorePlan()
+
+    live_categories = {}
+    for cat in guild.categories:
+        live_categories.setdefault(cat.name, []).append(cat)
+    live_channels = {}
+    for ch in guild.channels:
+        if not isinstance(ch, discord.CategoryChannel):
+            key = (ch.category.name if ch.category else None, ch.name, str(ch.type))
+            live_channels.setdefault(key, []).append(ch)
+
+    kept = set()
+    sections = [(None, data.get("uncategorized", []))]
+    sections += [(cat_data["name"], cat_data["channels"]) for cat_data in data.get("categories", [])]
+
+    for cat_name, channels in sections:
+        category = None
+        if cat_name is not None:
+            matches = live_categories.get(cat_name)
+            if matches:
+                category = matches.pop(0)
+                kept.add(category.id)
+            else:
+                result.create_categories.append(cat_name)
+            result.order.append((cat_name, None, category))
+
+        for ch_data in channels:
+            if ch_data["type"] == "category":
+                # older backups listed categories among the uncategorized channels
+                continue
+            # a channel can only be reused when its category was reused too
+            matches = live_channels.get((cat_name, ch_data["name"], ch_data["type"]))
+            if matches and (cat_name is None or category is not None):
+                channel = matches.pop(0)
+                kept.add(channel.id)
+                changes = {k: v for k, v in _settings(guild, ch_data).items() if getattr(channel, k, v) != v}
+                if changes:
+                    result.edit.append((channel, changes))
+                result.order.append((cat_name, ch_data, channel))
+            elif ch_data["type"] in CREATABLE:
+                result.create_channels.append((cat_name, category, ch_data))
+                result.order.append((cat_name, ch_data, None))
+            else:
+                result.unsupported += 1
+
+    result.delete = [ch for ch in guild.channels if ch.id not in kept]
+    return result
+
+
+async def _call(func, *args, retries=3, **kwargs):
+    return await rest_retry.call(func, *args, retries=retries, **kwargs)
+
+
+async def apply(guild, http, restore_plan, concurrency=4, progress=None, reason="Server restored"):
+    # Runs the plan in three dependency stages (deletes + new categories, then
+    # new and edited channels, then positions), each stage `concurrency`
+    # calls at a time. Returns (succeeded, failed) call counts.
+    sem = asyncio.Semaphore(concurrency)
+    total = len(restore_plan) + 1
+    done = 0
+    failed = 0
+    created_categories = {}
+    created_channels = {}  # id(ch_data) -> new channel
+
+    async def run(coro_func):
+        nonlocal done, failed
+        async with sem:
+            result = await coro_func()
+        if result is FAILED:
+            failed += 1
+        done += 1
+        if progress is not None:
+            await progress(done, total)
+        return result
+
+    def delete(channel):
+        return lambda: _call(channel.delete, reason=reason)
+
+    def create_category(name):
+        async def job():
+            category = await _call(guild.create_category, name, reason=reason)
+            if category is not FAILED:
+                created_categories[name] = category
+            return category
+        return job
+
+    def create_channel(cat_name, category, ch_data):
+        async def job():
+            # categories that did not exist were created in the first stage
+            parent = category or created_categories.get(cat_name)
+            create = guild.create_text_channel if ch_data["type"] == "text" else guild.create_voice_channel
+            channel = await _call(create, ch_data["name"], category=parent, reason=reason, **_settings(guild, ch_data))
+            if channel is not FAILED:
+                created_channels[id(ch_data)] = channel
+            return channel
+        return job
+
+    def edit(channel, changes):
+        return lambda: _call(channel.edit, reason=reason, **changes)
+
+    stage = [delete(ch) for ch in restore_plan.delete]
+    stage += [create_category(name) for name in restore_plan.create_categories]
+    await asyncio.gather(*(run(job) for job in stage))
+
+    stage = [create_channel(*entry) for entry in restore_plan.create_channels]
+    stage += [edit(channel, changes) for channel, changes in restore_plan.edit]
+    await asyncio.gather(*(run(job) for job in stage))
+
+    # one bulk PATCH for every position and parent instead of a call per channel
+    payload = []
+    parent = None
+    position = 0
+    for cat_name, ch_data, live in restore_plan.order:
+        if ch_data is None:
+            channel = live or created_categories.get(cat_name)
+            parent = channel
+        else:
+            channel = live or created_channels.get(id(ch_data))
+        if channel is None:
+            continue
+        entry = {"id": channel.id, "position": position}
+        if ch_data is not None:
+            entry["parent_id"] = parent.id if cat_name is not None and parent is not None else None
+        payload.append(entry)
+        position += 1
+    if payload:
+        await run(lambda: _call(http.bulk_channel_update, guild.id, payload, reason=reason))
+
+    return done - failed, failed
@@ -0,0 +1,37 @@
+# spam_tracker.py
+import time
+from collections import deque
+
+
+class SpamTracker:
+    # Sliding-window message counter per (guild, user). Every key holds at most
+    # `limit` timestamps in a fixed-size deque, and keys that went quiet are
+    # dropped by evict_idle() so memory stays flat however many users spoke.
+    def __init__(self, limit=5, window=5.0):
+        self.limit = limit
+        self.window = window
+        self._stamps = {}
+
+    def __len__(self):
+        return len(self._stamps)
+
+    def hit(self, guild_id, user_id, now=None):
+        # record a message and report whether `limit` messages fell inside the window
+        now = time.time() if now is None else now
+        key = (guild_id, user_id)
+        stamps = self._stamps.get(key)
+        if stamps is None:
+            stamps = self._stamps[key] = deque(maxlen=self.limit)
+        stamps.append(now)
+        return len(stamps) == self.limit and now - stamps[0] <= self.window
+
+    def reset(self, guild_id, user_id):
+        self._stamps.pop((guild_id, user_id), None)
+
+    def evict_idle(self, now=None):
+        now = time.time() if now is None else now
+        cutoff = now - self.window
+        idle = [key for key, stamps in self._stamps.items() if stamps[-1] < cutoff]
+        for key in idle:
+            del self._stamps[key]
+        return len(idle)
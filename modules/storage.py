@@ -0,0 +1,494 @@
+# storage.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from itertools import islice
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS guild_config (
+    guild_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (guild_id, key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS kv (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS user_backups (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    roles TEXT NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+) WITHOUT ROWID;
+
+-- role-set changes since the last full user backup, newest id wins
+CREATE TABLE IF NOT EXISTS user_backup_deltas (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    roles TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS user_backup_deltas_member ON user_backup_deltas (guild_id, user_id, id);
+
+CREATE TABLE IF NOT EXISTS server_backups (
+    guild_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+
+-- numbered snapshots taken by the backup scheduler, gzip compressed
+CREATE TABLE IF NOT EXISTS backup_generations (
+    guild_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    build_seconds REAL NOT NULL,
+    items INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    UNIQUE (guild_id, kind, generation)
+);
+"""
+
+# latest roles per member: the newest delta if there is one, else the snapshot
+LATEST_USER_ROLES = """
+SELECT user_id, roles FROM user_backups b
+WHERE guild_id = :guild AND NOT EXISTS (
+    SELECT 1 FROM user_backup_deltas d WHERE d.guild_id = b.guild_id AND d.user_id = b.user_id
+)
+UNION ALL
+SELECT user_id, roles FROM user_backup_deltas d
+WHERE guild_id = :guild AND id = (
+    SELECT MAX(id) FROM user_backup_deltas WHERE guild_id = d.guild_id AND user_id = d.user_id
+)
+"""
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def encode_config(config):
+    # top-level key -> JSON text, the form guild_config rows are stored in
+    return {str(key): _dumps(value) for key, value in config.items()}
+
+
+def encode_roles(role_ids):
+    return ",".join(str(r) for r in role_ids)
+
+
+def decode_roles(text):
+    return [int(r) for r in text.split(",") if r]
+
+
+class Storage:
+    # SQLite (WAL) store shared by the bot and the control panels. Guild config
+    # is one row per (guild, top-level key), so a change rewrites only the rows
+    # that differ instead of a whole JSON file.
+    #
+    # Reads go through their own connection: under WAL they see the last commit
+    # and never wait for a writer, so event-loop lookups aren't held up by a
+    # backup running in a worker thread. Bulk writes commit every WRITE_CHUNK
+    # rows to keep each hold of the write lock short.
+    WRITE_CHUNK = 2000
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._reader.execute("PRAGMA busy_timeout=5000")
+        # (guild id, key) -> last value written by this process
+        self._written = {}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        with self._read_lock:
+            self._reader.close()
+
+    def _read(self, sql, args=()):
+        with self._read_lock:
+            return self._reader.execute(sql, args).fetchall()
+
+    def _read_one(self, sql, args=()):
+        with self._read_lock:
+            return self._reader.execute(sql, args).fetchone()
+
+    def _write_chunks(self, sql, rows):
+        # executemany in WRITE_CHUNK sized transactions; returns the row count
+        rows = iter(rows)
+        total = 0
+        while True:
+            chunk = list(islice(rows, self.WRITE_CHUNK))
+            if not chunk:
+                return total
+            self._transaction(self._conn.executemany, sql, chunk)
+            total += len(chunk)
+
+    def checkpoint(self):
+        # fold the WAL back into the main file and truncate it
+        with self._lock:
+            return self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+
+    def _transaction(self, func, *args):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(*args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    # ---------- guild config ----------
+    def load_guild_configs(self):
+        configs = {}
+        rows = self._read("SELECT guild_id, key, value FROM guild_config")
+        for guild_id, key, value in rows:
+            configs.setdefault(str(guild_id), {})[key] = json.loads(value)
+            self._written[(guild_id, key)] = value
+        return configs
+
+    def load_guild_config(self, guild_id):
+        guild_id = int(guild_id)
+        rows = self._read("SELECT key, value FROM guild_config WHERE guild_id = ?", (guild_id,))
+        for key, value in rows:
+            self._written[(guild_id, key)] = value
+        return {key: json.loads(value) for key, value in rows}
+
+    def save_guild_config(self, guild_id, config):
+        self.save_guild_configs({guild_id: encode_config(config)})
+
+    def save_guild_configs(self, encoded):
+        # encoded: {guild id: encode_config(config)}; every guild is written in
+        # one transaction and only rows that differ from what this process last
+        # wrote are touched
+        # the cache only learns about rows once they are committed, so a failed
+        # flush is written in full when it is retried
+        written = {}
+        removed = []
+
+        def write():
+            for guild_id, rows in encoded.items():
+                guild_id = int(guild_id)
+                for key, value in rows.items():
+                    if self._written.get((guild_id, key)) != value:
+                        self._conn.execute(
+                            "INSERT INTO guild_config (guild_id, key, value) VALUES (?, ?, ?) "
+                            "ON CONFLICT (guild_id, key) DO UPDATE SET value = excluded.value",
+                            (guild_id, key, value)
+                        )
+                        written[(guild_id, key)] = value
+                stale = [k for (g, k) in self._written if g == guild_id and k not in rows]
+                for key in stale:
+                    self._conn.execute("DELETE FROM guild_config WHERE guild_id = ? AND key = ?", (guild_id, key))
+                    removed.append((guild_id, key))
+
+        with self._lock:
+            self._transaction(write)
+            self._written.update(written)
+            for key in removed:
+                self._written.pop(key, None)
+
+    # ---------- key/value documents ----------
+    def get(self, name, default=None):
+        row = self._read_one("SELECT value FROM kv WHERE name = ?", (name,))
+        return default if row is None else json.loads(row[0])
+
+    def get_versioned(self, name):
+        row = self._read_one("SELECT value, version FROM kv WHERE name = ?", (name,))
+        return (None, None) if row is None else (json.loads(row[0]), row[1])
+
+    def version(self, name):
+        row = self._read_one("SELECT version FROM kv WHERE name = ?", (name,))
+        return None if row is None else row[0]
+
+    def delete(self, name):
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE name = ?", (name,))
+
+    def set(self, name, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO kv (name, value) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = excluded.value, version = version + 1",
+                (name, _dumps(value))
+            )
+            return self._conn.execute("SELECT version FROM kv WHERE name = ?", (name,)).fetchone()[0]
+
+    # ---------- user backups ----------
+    def user_delta_mark(self, guild_id):
+        # newest delta id; read when a snapshot is taken and passed to replace_user_backup
+        return self._read_one(
+            "SELECT COALESCE(MAX(id), 0) FROM user_backup_deltas WHERE guild_id = ?", (int(guild_id),)
+        )[0]
+
+    def replace_user_backup(self, guild_id, rows, mark):
+        # rows: iterable of (user id, [role ids]) captured when the delta id
+        # was `mark`. Rows are upserted in chunks and members missing from the
+        # new snapshot are removed afterwards, so a reader always sees each
+        # member's old or new roles, never a gap.
+        seen = set()
+        count = self.upsert_user_backup(guild_id, rows, seen)
+        self.finish_user_backup(guild_id, seen, mark)
+        return count
+
+    def upsert_user_backup(self, guild_id, rows, seen):
+        # one page of a snapshot; adds the written user ids to `seen`
+        guild_id = int(guild_id)
+
+        def encoded():
+            for uid, roles in rows:
+                seen.add(int(uid))
+                yield guild_id, int(uid), encode_roles(roles)
+
+        return self._write_chunks(
+            "INSERT INTO user_backups (guild_id, user_id, roles) VALUES (?, ?, ?) "
+            "ON CONFLICT (guild_id, user_id) DO UPDATE SET roles = excluded.roles",
+            encoded()
+        )
+
+    def finish_user_backup(self, guild_id, seen, mark):
+        # ends a paged snapshot: drops members it didn't write and the deltas it supersedes
+        guild_id = int(guild_id)
+        after = -1
+        while True:
+            page = [r[0] for r in self._read(
+                "SELECT user_id FROM user_backups WHERE guild_id = ? AND user_id > ? ORDER BY user_id LIMIT ?",
+                (guild_id, after, self.WRITE_CHUNK)
+            )]
+            stale = [(guild_id, uid) for uid in page if uid not in seen]
+            if stale:
+                self._transaction(
+                    self._conn.executemany, "DELETE FROM user_backups WHERE guild_id = ? AND user_id = ?", stale
+                )
+            if len(page) < self.WRITE_CHUNK:
+                break
+            after = page[-1]
+
+        # deltas older than the snapshot are superseded; ones written after it
+        # was taken are newer than its rows and still apply
+        with self._lock:
+            self._conn.execute("DELETE FROM user_backup_deltas WHERE guild_id = ? AND id <= ?", (guild_id, mark))
+
+    def append_user_deltas(self, guild_id, rows):
+        # rows: iterable of (user id, [role ids]) whose role set changed
+        guild_id = int(guild_id)
+        return self._write_chunks(
+            "INSERT INTO user_backup_deltas (guild_id, user_id, roles) VALUES (?, ?, ?)",
+            ((guild_id, int(uid), encode_roles(roles)) for uid, roles in rows)
+        )
+
+    def compact_user_backup(self, guild_id=None):
+        # fold deltas into the snapshot, WRITE_CHUNK delta ids per transaction
+        # in id order so a later chunk's newer roles win; all guilds when
+        # guild_id is None
+        scope = "1" if guild_id is None else "guild_id = :guild"
+        args = {"guild": None if guild_id is None else int(guild_id)}
+        folded = 0
+
+        def write(low, high):
+            self._conn.execute(
+                "INSERT INTO user_backups (guild_id, user_id, roles) "
+                f"SELECT guild_id, user_id, roles FROM user_backup_deltas d WHERE {scope} "
+                "AND id > :low AND id <= :high AND id = ("
+                "    SELECT MAX(id) FROM user_backup_deltas "
+                "    WHERE guild_id = d.guild_id AND user_id = d.user_id AND id <= :high) "
+                "ON CONFLICT (guild_id, user_id) DO UPDATE SET roles = excluded.roles",
+                {**args, "low": low, "high": high}
+            )
+            return self._conn.execute(
+                f"DELETE FROM user_backup_deltas WHERE {scope} AND id > :low AND id <= :high",
+                {**args, "low": low, "high": high}
+            ).rowcount
+
+        low, top = self._read_one(f"SELECT COALESCE(MIN(id), 1) - 1, COALESCE(MAX(id), 0) FROM user_backup_deltas WHERE {scope}", args)
+        while low < top:
+            high = low + self.WRITE_CHUNK
+            folded += self._transaction(write, low, high)
+            low = high
+        return folded
+
+    def user_delta_count(self, guild_id):
+        return self._read_one(
+            "SELECT COUNT(*) FROM user_backup_deltas WHERE guild_id = ?", (int(guild_id),)
+        )[0]
+
+    def has_user_backup(self, guild_id):
+        return self._read_one(
+            "SELECT 1 FROM user_backups WHERE guild_id = ? LIMIT 1", (int(guild_id),)
+        ) is not None
+
+    def get_user_backup(self, guild_id, user_id):
+        args = (int(guild_id), int(user_id))
+        row = self._read_one(
+            "SELECT roles FROM user_backup_deltas WHERE guild_id = ? AND user_id = ? ORDER BY id DESC LIMIT 1", args
+        )
+        if row is None:
+            row = self._read_one("SELECT roles FROM user_backups WHERE guild_id = ? AND user_id = ?", args)
+        return None if row is None else decode_roles(row[0])
+
+    def user_backup_page(self, guild_id, after=-1, limit=2000):
+        # latest roles of the next `limit` members with user id > after
+        rows = self._read(
+            f"SELECT user_id, roles FROM ({LATEST_USER_ROLES}) WHERE user_id > :after "
+            "ORDER BY user_id LIMIT :limit", {"guild": int(guild_id), "after": after, "limit": limit}
+        )
+        return [(user_id, decode_roles(roles)) for user_id, roles in rows]
+
+    def iter_user_backup(self, guild_id, page=2000):
+        # paged by user id so a large backup is never held in memory at once
+        after = -1
+        while True:
+            rows = self.user_backup_page(guild_id, after, page)
+            yield from rows
+            if len(rows) < page:
+                return
+            after = rows[-1][0]
+
+    def user_backup_count(self, guild_id):
+        return self._read_one(f"SELECT COUNT(*) FROM ({LATEST_USER_ROLES})", {"guild": int(guild_id)})[0]
+
+    # ---------- server backups ----------
+    def set_server_backup(self, guild_id, data):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO server_backups (guild_id, data, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (guild_id) DO UPDATE SET data = excluded.data, created_at = excluded.created_at",
+                (int(guild_id), _dumps(data), time.time())
+            )
+
+    def get_server_backup(self, guild_id):
+        row = self._read_one("SELECT data FROM server_backups WHERE guild_id = ?", (int(guild_id),))
+        return None if row is None else json.loads(row[0])
+
+    # ---------- backup generations ----------
+    def add_generation(self, guild_id, kind, data, items, build_seconds):
+        guild_id = int(guild_id)
+
+        def write():
+            generation = self._conn.execute(
+                "SELECT COALESCE(MAX(generation), 0) + 1 FROM backup_generations WHERE guild_id = ? AND kind = ?",
+                (guild_id, kind)
+            ).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO backup_generations (guild_id, kind, generation, created_at, build_seconds, items, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (guild_id, kind, generation, time.time(), build_seconds, items, data)
+            )
+            return generation
+
+        return self._transaction(write)
+
+    def latest_generation(self, guild_id, kind):
+        # metadata of the newest generation, without its data
+        row = self._read_one(
+            "SELECT generation, created_at, build_seconds, items, LENGTH(data) FROM backup_generations "
+            "WHERE guild_id = ? AND kind = ? ORDER BY generation DESC LIMIT 1", (int(guild_id), kind)
+        )
+        if row is None:
+            return None
+        return dict(zip(("generation", "created_at", "build_seconds", "items", "size"), row))
+
+    def get_generation(self, guild_id, kind, generation):
+        row = self._read_one(
+            "SELECT data FROM backup_generations WHERE guild_id = ? AND kind = ? AND generation = ?",
+            (int(guild_id), kind, int(generation))
+        )
+        return None if row is None else row[0]
+
+    def generation_numbers(self, guild_id, kind):
+        return [r[0] for r in self._read(
+            "SELECT generation FROM backup_generations WHERE guild_id = ? AND kind = ? ORDER BY generation",
+            (int(guild_id), kind)
+        )]
+
+    def prune_generations(self, guild_id, kind, keep, max_age=None):
+        # keeps the newest `keep` generations, minus those older than max_age
+        # seconds; the newest one always survives
+        guild_id = int(guild_id)
+        cutoff = time.time() - max_age if max_age else 0
+
+        def write():
+            return self._conn.execute(
+                "DELETE FROM backup_generations WHERE guild_id = :guild AND kind = :kind AND generation < ("
+                "    SELECT MAX(generation) FROM backup_generations WHERE guild_id = :guild AND kind = :kind"
+                ") AND (generation NOT IN ("
+                "    SELECT generation FROM backup_generations WHERE guild_id = :guild AND kind = :kind "
+                "    ORDER BY generation DESC LIMIT :keep"
+                ") OR created_at < :cutoff)",
+                {"guild": guild_id, "kind": kind, "keep": max(keep, 1), "cutoff": cutoff}
+            ).rowcount
+
+        return self._transaction(write)
+
+    # ---------- one-time import of the old JSON files ----------
+    def import_json_files(self, guild_file=None, admins_file=None, filter_file=None, tran_file=None,
+                          user_backup_file=None, server_backup_file=None, default_guild_id=None):
+        imported = set(self.get("imported_files", []))
+
+        def load(path):
+            if not path or path in imported or not os.path.exists(path):
+                return None
+            try:
+                with open(path, "r") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+
+        done = []
+
+        data = load(guild_file)
+        if data is not None:
+            for guild_id, config in data.items():
+                if str(guild_id).isdigit():
+                    self.save_guild_config(guild_id, config)
+            done.append(guild_file)
+
+        data = load(admins_file)
+        if data is not None:
+            self.set("admins", data)
+            done.append(admins_file)
+
+        data = load(filter_file)
+        if data is not None:
+            # offenses used to live inside the filter config
+            offenses = self.get("offenses", {})
+            offenses.setdefault("nsfw", {}).update(data.pop("offenses", {}))
+            offenses.setdefault("doxx", {}).update(data.get("doxx", {}).pop("offenses", {}))
+            self.set("nsfw_filter", data)
+            self.set("offenses", offenses)
+            done.append(filter_file)
+
+        data = load(tran_file)
+        if data is not None:
+            self.set("tran_data", data)
+            done.append(tran_file)
+
+        # the old backup files were not scoped to a guild
+        if default_guild_id is not None:
+            data = load(user_backup_file)
+            if data is not None:
+                self.replace_user_backup(default_guild_id, data.items(), self.user_delta_mark(default_guild_id))
+                done.append(user_backup_file)
+
+            data = load(server_backup_file)
+            if data is not None:
+                self.set_server_backup(default_guild_id, data)
+                done.append(server_backup_file)
+
+        if done:
+            self.set("imported_files", sorted(imported | set(done)))
+        return done
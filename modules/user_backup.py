@@ -0,0 +1,205 @@
+# user_backup.py
+import asyncio
+import bisect
+import gzip
+import json
+
+from modules import rest_retry
+
+# rough SQLite row cost: key + row header, then one "id," per role
+ROW_BYTES = 32
+ROLE_BYTES = 20
+
+
+def role_ids(member):
+    # Member.roles always starts with @everyone
+    return [r.id for r in member.roles[1:]]
+
+
+async def snapshot_members(members, batch=5000):
+    # (user id, [role ids]) per non-bot member. Built on the event loop so
+    # worker threads only ever see plain ids, never live cache objects; the
+    # loop gets a turn every `batch` members.
+    rows = []
+    for i, m in enumerate(members, 1):
+        if not m.bot:
+            rows.append((m.id, role_ids(m)))
+        if i % batch == 0:
+            await asyncio.sleep(0)
+    return rows
+
+
+def estimate_size(guild):
+    # (members, bytes) the backup will take, from the cached member and role
+    # counts only; nothing is copied
+    members = guild.member_count or 0
+    assignments = sum(len(r.members) for r in guild.roles[1:])
+    return members, members * ROW_BYTES + assignments * ROLE_BYTES
+
+
+async def write_backup(storage, guild_id, members, page=5000):
+    # Replaces the user backup with the members' current roles. Each page of
+    # rows is snapshotted on the loop and written in a worker thread before
+    # the next one is taken, so the roster is never copied whole. Deltas
+    # flushed after the start are newer than the rows and are kept.
+    mark = storage.user_delta_mark(guild_id)
+    seen = set()
+    count = 0
+    rows = []
+    for m in members:
+        if not m.bot:
+            rows.append((m.id, role_ids(m)))
+        if len(rows) >= page:
+            count += await asyncio.to_thread(storage.upsert_user_backup, guild_id, rows, seen)
+            rows = []
+    if rows:
+        count += await asyncio.to_thread(storage.upsert_user_backup, guild_id, rows, seen)
+    await asyncio.to_thread(storage.finish_user_backup, guild_id, seen, mark)
+    return count
+
+
+def write_ndjson_gz(rows, fp):
+    # one {"user": id, "roles": [...]} record per line, gzip compressed
+    count = 0
+    with gzip.GzipFile(fileobj=fp, mode="wb") as gz:
+        for user_id, roles in rows:
+            gz.write(json.dumps({"user": user_id, "roles": roles}, separators=(",", ":")).encode("utf-8"))
+            gz.write(b"\n")
+            count += 1
+    fp.seek(0)
+    return count
+
+
+def read_ndjson_gz(data):
+    # rows written by write_ndjson_gz, sorted by user id
+    rows = []
+    for line in gzip.decompress(data).splitlines():
+        if line:
+            record = json.loads(line)
+            rows.append((record["user"], record["roles"]))
+    rows.sort()
+    return rows
+
+
+def export_ndjson_gz(storage, guild_id, fp):
+    # runs in a worker thread and reads the backup page by page
+    return write_ndjson_gz(storage.iter_user_backup(guild_id), fp)
+
+
+def resolve_roles(guild, role_ids, member=None):
+    # one pass over the backed-up ids: roles that still exist and the bot can
+    # assign, and how many could not be restored. Roles the member already
+    # has are left out of the REST call.
+    roles = []
+    failed = 0
+    have = {r.id for r in member.roles} if member is not None else ()
+    for role_id in role_ids:
+        role = guild.get_role(role_id)
+        if role is None or not role.is_assignable():
+            failed += 1
+        elif role_id not in have:
+            roles.append(role)
+    return roles, failed
+
+
+def write_incremental(storage, guild_id, rows):
+    # runs in a worker thread; appends a delta only for members whose role
+    # set differs from the latest backed-up one
+    latest = {user_id: set(roles) for user_id, roles in storage.iter_user_backup(guild_id)}
+    changed = [(uid, roles) for uid, roles in rows if latest.get(uid) != set(roles)]
+    if changed:
+        storage.append_user_deltas(guild_id, changed)
+    return changed
+
+
+class DeltaBuffer:
+    # Role changes seen in on_member_update, coalesced per (guild, user) so a
+    # member whose roles flap between flushes produces a single delta row.
+    def __init__(self):
+        self._pending = {}  # guild id -> {user id: [role ids]}
+
+    def __len__(self):
+        return sum(len(users) for users in self._pending.values())
+
+    def add(self, member):
+        self._pending.setdefault(member.guild.id, {})[member.id] = role_ids(member)
+
+    def take(self):
+        pending = self._pending
+        self._pending = {}
+        return pending
+
+    def restore(self, pending):
+        # puts back a batch whose write failed; changes buffered since win
+        for guild_id, users in pending.items():
+            current = self._pending.setdefault(guild_id, {})
+            for user_id, roles in users.items():
+                current.setdefault(user_id, roles)
+
+
+def write_deltas(storage, pending):
+    # runs in a worker thread; guilds without a full backup have nothing to
+    # be incremental against and are skipped
+    written = 0
+    for guild_id, users in pending.items():
+        if storage.has_user_backup(guild_id):
+            written += storage.append_user_deltas(guild_id, users.items())
+    return written
+
+
+async def _add_roles(member, roles, retries=3):
+    result = await rest_retry.call(member.add_roles, *roles, reason="User restored", retries=retries)
+    return result is not rest_retry.FAILED
+
+
+def restore_key(guild_id, generation=None):
+    # kv name of a restore checkpoint; each backup source has its own
+    return f"user_restore:{guild_id}" if generation is None else f"user_restore:{guild_id}:gen{generation}"
+
+
+async def restore_all(storage, guild, concurrency=4, page=200, progress=None, rows=None, generation=None):
+    # Gives every member still in the guild their backed-up roles, `concurrency`
+    # members at a time. Progress is checkpointed in storage after each page, so
+    # an interrupted run picks up after the last finished page. `rows` (sorted
+    # by user id) restores an archived generation instead of the live backup.
+    key = restore_key(guild.id, generation)
+    state = storage.get(key) or {"after": -1, "done": 0, "restored": 0, "failed": 0, "missing": 0}
+    if rows is None:
+        total = storage.user_backup_count(guild.id)
+
+        def next_page(after):
+            return storage.user_backup_page(guild.id, after, page)
+    else:
+        total = len(rows)
+        ids = [user_id for user_id, _ in rows]
+
+        def next_page(after):
+            start = bisect.bisect_right(ids, after)
+            return rows[start:start + page]
+    sem = asyncio.Semaphore(concurrency)
+
+    async def restore(user_id, role_ids):
+        member = guild.get_member(user_id)
+        if member is None:
+            state["missing"] += 1
+            return
+        roles, _ = resolve_roles(guild, role_ids, member)
+        if not roles:
+            return
+        async with sem:
+            ok = await _add_roles(member, roles)
+        state["restored" if ok else "failed"] += 1
+
+    while True:
+        batch = next_page(state["after"])
+        if not batch:
+            break
+        await asyncio.gather(*(restore(user_id, role_ids) for user_id, role_ids in batch))
+        state["after"] = batch[-1][0]
+        state["done"] += len(batch)
+        storage.set(key, state)
+        if progress is not None:
+            await progress(min(state["done"], total), total)
+
+    storage.delete(key)
+    return state
@@ -0,0 +1,71 @@
+# word_matcher.py
+import re
+from collections import deque
+
+_STRICT_TEXT = re.compile(r"[^a-zA-Z0-9]")
+_STRICT_WORD = re.compile(r"\s+|[^a-zA-Z0-9]")
+
+
+def normalize_strict(text):
+    return _STRICT_TEXT.sub("", text.lower())
+
+
+class WordMatcher:
+    # Aho-Corasick automaton over the filtered words. Built once per word list
+    # change, then every message is scanned in one pass no matter how many words.
+    def __init__(self, words, strict=False):
+        self.strict = strict
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [False]
+        self.size = 0
+
+        for word in words:
+            word = _STRICT_WORD.sub("", word.lower()) if strict else word.lower()
+            # an empty pattern would match every message
+            if word:
+                self._add(word)
+        self._link()
+
+    def _add(self, word):
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(False)
+            node = nxt
+        if not self._out[node]:
+            self._out[node] = True
+            self.size += 1
+
+    def _link(self):
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] or out[fail[nxt]]
+
+    def matches(self, text):
+        if not self.size:
+            return False
+        text = normalize_strict(text) if self.strict else text.lower()
+
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                return True
+        return False